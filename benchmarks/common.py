@@ -0,0 +1,15 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def child_env(**overrides):
+    """Environment for a fresh interpreter that imports the repo's biweekly_release."""
+    env = dict(os.environ)
+    # Put build/ (the packaged dependencies) after the repo root so the root
+    # biweekly_release.py wins over the stale copy in build/.
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT), str(ROOT / "build")])
+    env.update(overrides)
+    return env
@@ -0,0 +1,679 @@
+"""In-process stand-in for the parts of the GitHub API biweekly_release uses.
+
+``FakeGitHub`` serves REST and GraphQL over a real local HTTP socket, so the
+release code runs unmodified (pooled connections, retries, caching and all)
+with ``API_BASE`` pointed at ``server.api_base``. Repos are stateful: refs,
+commits, trees, tags and pull requests change as the release writes to them.
+
+Latency, 5xx errors and rate limits can be injected per request, and every
+request is counted along with the bytes sent and received.
+``synthetic_repo`` builds repos at the scale the benchmarks need.
+"""
+import base64
+import hashlib
+import io
+import itertools
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+GRAPHQL_BLOB_LIMIT = 512 * 1024  # GraphQL returns Blob.text truncated beyond this
+
+
+class FakeRepo:
+    """A git repository reduced to what the release flow can observe."""
+
+    def __init__(self, owner, name, files, main_branch="main"):
+        self.owner = owner
+        self.name = name
+        self.main_branch = main_branch
+        self.commits = {}  # sha -> {"tree": {path: text}, "parents": [...], "message": str}
+        self.trees = {}  # tree sha -> {path: text}
+        self.refs = {}  # "heads/<b>" / "tags/<t>" -> sha
+        self.tag_objects = {}  # tag sha -> {"tag", "message", "object"}
+        self.pulls = {}  # number -> pull dict
+        self.merge_conflicts = set()  # head branches whose merge should fail
+        self._numbers = itertools.count(1)
+        self._lock = threading.RLock()
+        root = self.commit(dict(files), [], "Initial commit")
+        self.refs[f"heads/{main_branch}"] = root
+
+    # -- object store ----------------------------------------------------
+    @staticmethod
+    def _hash(*parts):
+        return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def store_tree(self, files):
+        # str hashes are cached on the object, so big unchanged files cost nothing here.
+        sha = self._hash("tree", *(f"{p}\0{len(c)}\0{hash(c)}" for p, c in sorted(files.items())))
+        self.trees[sha] = files
+        return sha
+
+    def commit(self, files, parents, message):
+        tree = self.store_tree(files)
+        sha = self._hash("commit", tree, message, *parents, str(len(self.commits)))
+        self.commits[sha] = {"tree": tree, "parents": list(parents), "message": message, "date": time.time()}
+        return sha
+
+    def files_at(self, ref):
+        sha = self.resolve(ref)
+        return None if sha is None else self.trees[self.commits[sha]["tree"]]
+
+    def resolve(self, ref):
+        """Branch, tag or commit sha -> commit sha."""
+        if ref in self.commits:
+            return ref
+        sha = self.refs.get(f"heads/{ref}") or self.refs.get(f"tags/{ref}")
+        if sha in self.tag_objects:
+            sha = self.tag_objects[sha]["object"]
+        return sha
+
+    # -- seeding helpers ---------------------------------------------------
+    def add_branch(self, name, files=None, message=None, from_ref=None):
+        base = self.resolve(from_ref or self.main_branch)
+        if files:
+            tree = dict(self.files_at(base))
+            tree.update(files)
+            base = self.commit(tree, [base], message or f"Work on {name}")
+        self.refs[f"heads/{name}"] = base
+        return base
+
+    def add_commit(self, branch, files, message):
+        parent = self.refs[f"heads/{branch}"]
+        tree = dict(self.trees[self.commits[parent]["tree"]])
+        tree.update(files)
+        self.refs[f"heads/{branch}"] = self.commit(tree, [parent], message)
+        return self.refs[f"heads/{branch}"]
+
+    def open_pull(self, head, title=None, body=""):
+        number = next(self._numbers)
+        self.pulls[number] = {
+            "number": number, "title": title or f"{head} into {self.main_branch}", "body": body,
+            "head": head, "base": self.main_branch, "state": "open", "merged": False,
+        }
+        return number
+
+    def pull_json(self, api_base, pr):
+        return {
+            "number": pr["number"], "title": pr["title"], "body": pr["body"], "state": pr["state"],
+            "html_url": f"https://github.invalid/{self.owner}/{self.name}/pull/{pr['number']}",
+            "url": f"{api_base}/pulls/{pr['number']}", "merged": pr["merged"],
+            "merge_commit_sha": pr.get("merge_commit_sha"),
+            "head": {"ref": pr["head"], "sha": self.refs.get(f"heads/{pr['head']}")},
+            "base": {"ref": pr["base"]},
+        }
+
+    def tarball(self, ref):
+        sha = self.resolve(ref)
+        root = f"{self.owner}-{self.name}-{sha[:7]}"
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+            for path, text in sorted(self.files_at(sha).items()):
+                data = text.encode("utf-8")
+                info = tarfile.TarInfo(f"{root}/{path}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return buf.getvalue()
+
+
+@dataclass
+class Faults:
+    """Per-request fault injection. Rates are probabilities in [0, 1]."""
+
+    latency: float = 0.0  # seconds added to every request
+    jitter: float = 0.0  # extra uniform random latency
+    error_rate: float = 0.0  # chance of a 502 on reads (GET and GraphQL)
+    write_error_rate: float = 0.0  # chance of a 502 on writes, before anything changes
+    late_error_rate: float = 0.0  # chance of a 502 on writes *after* the change was applied
+    late_error_endpoints: tuple = ()  # endpoint templates whose writes always 502 after applying
+    rate_limit_rate: float = 0.0  # chance of a secondary-rate-limit 403
+    rate_limit: int = 5000  # primary budget; 403 with X-RateLimit-Remaining: 0 once spent
+    seed: int = 0
+    _rng: random.Random = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+
+@dataclass
+class Stats:
+    requests: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    not_modified: int = 0
+    injected_errors: int = 0
+    rate_limited: int = 0
+    by_endpoint: dict = field(default_factory=dict)
+
+
+class FakeGitHub:
+    """Threaded local HTTP server hosting any number of ``FakeRepo``s."""
+
+    def __init__(self, faults=None):
+        self.repos = {}
+        self.faults = faults or Faults()
+        self.stats = Stats()
+        self._lock = threading.Lock()
+        self._budget_used = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def api_base(self, repo):
+        return f"{self.url}/repos/{repo.owner}/{repo.name}"
+
+    def add_repo(self, repo):
+        self.repos[(repo.owner, repo.name)] = repo
+        return repo
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = Stats()
+            self._budget_used = 0
+
+    def _count(self, endpoint, bytes_in):
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes_in += bytes_in
+            self.stats.by_endpoint[endpoint] = self.stats.by_endpoint.get(endpoint, 0) + 1
+            self._budget_used += 1
+            return self.faults.rate_limit - self._budget_used
+
+
+class _Reply(Exception):
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+def _handler_for(server):
+    class Handler(_Handler):
+        fake = server
+    return Handler
+
+
+_ROUTES = []
+
+
+def route(method, pattern):
+    def register(func):
+        _ROUTES.append((method, re.compile(pattern + r"$"), func))
+        return func
+    return register
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body are separate writes
+    fake = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch()
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = do_GET
+
+    def _dispatch(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        fake = self.fake
+        endpoint = _template(self.command, path)
+        remaining = fake._count(endpoint, len(raw) + len(self.path))
+        faults = fake.faults
+        reset = int(time.time()) + 60
+        rate_headers = {
+            "X-RateLimit-Limit": str(faults.rate_limit),
+            "X-RateLimit-Remaining": str(max(remaining, 0)),
+            "X-RateLimit-Reset": str(reset),
+            "X-RateLimit-Resource": "graphql" if path == "/graphql" else "core",
+        }
+        delay = faults.latency + (faults._rng.uniform(0, faults.jitter) if faults.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        try:
+            if remaining < 0:
+                fake.stats.rate_limited += 1
+                raise _Reply(403, {"message": "API rate limit exceeded"})
+            if faults.rate_limit_rate and faults._rng.random() < faults.rate_limit_rate:
+                fake.stats.rate_limited += 1
+                raise _Reply(403, {"message": "You have exceeded a secondary rate limit."}, {"Retry-After": "0"})
+            write = self.command != "GET" and path != "/graphql"
+            rate = faults.write_error_rate if write else faults.error_rate
+            if rate and faults._rng.random() < rate:
+                fake.stats.injected_errors += 1
+                raise _Reply(502, {"message": "Server Error"})
+            body = json.loads(raw) if raw else None
+            for method, pattern, func in _ROUTES:
+                m = pattern.match(path)
+                if method == self.command and m:
+                    kwargs = m.groupdict()
+                    repo = None
+                    if "owner" in kwargs:
+                        repo = fake.repos.get((kwargs.pop("owner"), kwargs.pop("name")))
+                        if repo is None:
+                            raise _Reply(404, {"message": "Not Found"})
+                    with (repo._lock if repo else threading.Lock()):
+                        result = func(fake, repo, query, body, self.headers, **kwargs)
+                    if write and (endpoint in faults.late_error_endpoints
+                                  or (faults.late_error_rate and faults._rng.random() < faults.late_error_rate)):
+                        fake.stats.injected_errors += 1
+                        raise _Reply(502, {"message": "Server Error"})  # the write above still happened
+                    raise result if isinstance(result, _Reply) else _Reply(200, result)
+            raise _Reply(404, {"message": "Not Found"})
+        except _Reply as reply:
+            self._send(reply, rate_headers)
+
+    def _send(self, reply, rate_headers):
+        headers = {**rate_headers, **reply.headers}
+        body = reply.body
+        if isinstance(body, bytes):
+            payload = body
+            headers.setdefault("Content-Type", "application/octet-stream")
+        elif isinstance(body, str):
+            payload = body.encode("utf-8")
+            headers.setdefault("Content-Type", "text/plain; charset=utf-8")
+        else:
+            payload = b"" if body is None else json.dumps(body).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json; charset=utf-8")
+        status = reply.status
+        if status == 200 and self.command == "GET":
+            etag = '"%s"' % hashlib.sha1(payload).hexdigest()
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                status, payload = 304, b""
+                self.fake.stats.not_modified += 1
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        with self.fake._lock:
+            self.fake.stats.bytes_out += len(payload)
+
+
+_TEMPLATES = [
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/{repo}"),
+    (re.compile(r"/branches/.+$"), "/branches/{branch}"),
+    (re.compile(r"/git/refs?/(heads|tags)/.+$"), r"/git/ref/\1/{ref}"),
+    (re.compile(r"/git/commits/[0-9a-f]+$"), "/git/commits/{sha}"),
+    (re.compile(r"/(pulls|issues)/\d+"), r"/\1/{number}"),
+    (re.compile(r"/contents/.+$"), "/contents/{path}"),
+    (re.compile(r"/tarball/.+$"), "/tarball/{ref}"),
+    (re.compile(r"/compare/.+$"), "/compare/{range}"),
+]
+
+
+def _template(method, path):
+    for pattern, repl in _TEMPLATES:
+        path = pattern.sub(repl, path)
+    return f"{method} {path}"
+
+
+REPO = r"/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)"
+
+
+def _ancestors(repo, sha):
+    seen = set()
+    while sha and sha not in seen:
+        seen.add(sha)
+        parents = repo.commits[sha]["parents"]
+        sha = parents[0] if parents else None
+    return seen
+
+
+def _paginate(items, query):
+    per_page = int(query.get("per_page", 30))
+    page = int(query.get("page", 1))
+    return items[(page - 1) * per_page:page * per_page]
+
+
+def _commit_json(repo, sha):
+    commit = repo.commits[sha]
+    return {
+        "sha": sha, "tree": {"sha": commit["tree"]}, "message": commit["message"],
+        "parents": [{"sha": p} for p in commit["parents"]],
+        "commit": {"message": commit["message"], "author": {"name": "fake", "date": _iso(commit["date"])}},
+    }
+
+
+def _iso(ts):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+# -- REST ------------------------------------------------------------------
+@route("GET", REPO + "/branches")
+def list_branches(fake, repo, query, body, headers):
+    names = sorted(ref[len("heads/"):] for ref in repo.refs if ref.startswith("heads/"))
+    return [{"name": n, "commit": {"sha": repo.refs[f"heads/{n}"]}} for n in _paginate(names, query)]
+
+
+@route("GET", REPO + "/branches/(?P<branch>.+)")
+def get_branch(fake, repo, query, body, headers, branch):
+    sha = repo.refs.get(f"heads/{branch}")
+    if sha is None:
+        return _Reply(404, {"message": "Branch not found"})
+    return {"name": branch, "commit": {"sha": sha}}
+
+
+@route("GET", REPO + "/git/ref/(?P<ref>.+)")
+def get_ref(fake, repo, query, body, headers, ref):
+    if ref not in repo.refs:
+        return _Reply(404, {"message": "Not Found"})
+    return {"ref": f"refs/{ref}", "object": {"sha": repo.refs[ref]}}
+
+
+@route("POST", REPO + "/git/refs")
+def create_ref(fake, repo, query, body, headers):
+    ref = body["ref"][len("refs/"):]
+    if ref in repo.refs:
+        return _Reply(422, {"message": "Reference already exists"})
+    if body["sha"] not in repo.commits and body["sha"] not in repo.tag_objects:
+        return _Reply(422, {"message": "Object does not exist"})
+    repo.refs[ref] = body["sha"]
+    return _Reply(201, {"ref": body["ref"], "object": {"sha": body["sha"]}})
+
+
+@route("PATCH", REPO + "/git/refs/(?P<ref>.+)")
+def update_ref(fake, repo, query, body, headers, ref):
+    if ref not in repo.refs:
+        return _Reply(422, {"message": "Reference does not exist"})
+    new, old = body["sha"], repo.refs[ref]
+    if not body.get("force"):
+        ancestors, todo = set(), [new]
+        while todo:
+            sha = todo.pop()
+            if sha not in ancestors:
+                ancestors.add(sha)
+                todo.extend(repo.commits[sha]["parents"])
+        if old not in ancestors:
+            return _Reply(422, {"message": "Update is not a fast forward"})
+    repo.refs[ref] = new
+    return {"ref": f"refs/{ref}", "object": {"sha": new}}
+
+
+@route("GET", REPO + "/git/commits/(?P<sha>[0-9a-f]+)")
+def get_commit(fake, repo, query, body, headers, sha):
+    if sha not in repo.commits:
+        return _Reply(404, {"message": "Not Found"})
+    return _commit_json(repo, sha)
+
+
+@route("POST", REPO + "/git/trees")
+def create_tree(fake, repo, query, body, headers):
+    files = dict(repo.trees.get(body.get("base_tree"), {}))
+    for entry in body["tree"]:
+        if entry.get("sha") is None and "content" not in entry:
+            files.pop(entry["path"], None)
+        else:
+            files[entry["path"]] = entry["content"]
+    return _Reply(201, {"sha": repo.store_tree(files)})
+
+
+@route("POST", REPO + "/git/commits")
+def create_commit(fake, repo, query, body, headers):
+    files = repo.trees[body["tree"]]
+    sha = repo.commit(files, body["parents"], body["message"])
+    return _Reply(201, _commit_json(repo, sha))
+
+
+@route("POST", REPO + "/git/tags")
+def create_tag(fake, repo, query, body, headers):
+    sha = FakeRepo._hash("tag", body["tag"], body["object"])
+    repo.tag_objects[sha] = {"tag": body["tag"], "message": body["message"], "object": body["object"]}
+    return _Reply(201, {"sha": sha, "tag": body["tag"], "object": {"sha": body["object"], "type": "commit"}})
+
+
+@route("GET", REPO + "/pulls")
+def list_pulls(fake, repo, query, body, headers):
+    pulls = [
+        pr for pr in repo.pulls.values()
+        if query.get("state", "open") in ("all", pr["state"])
+        and query.get("base", pr["base"]) == pr["base"]
+        and query.get("head", pr["head"]).split(":")[-1] == pr["head"]
+    ]
+    return [repo.pull_json(fake.api_base(repo), pr) for pr in _paginate(pulls, query)]
+
+
+@route("GET", REPO + r"/pulls/(?P<number>\d+)")
+def get_pull(fake, repo, query, body, headers, number):
+    pr = repo.pulls.get(int(number))
+    if pr is None:
+        return _Reply(404, {"message": "Not Found"})
+    return repo.pull_json(fake.api_base(repo), pr)
+
+
+@route("POST", REPO + "/pulls")
+def create_pull(fake, repo, query, body, headers):
+    head, base = body["head"].split(":")[-1], body["base"]
+    if f"heads/{head}" not in repo.refs:
+        return _Reply(422, {"message": "Validation Failed", "errors": [{"field": "head", "code": "invalid"}]})
+    if any(pr["head"] == head and pr["base"] == base and pr["state"] == "open" for pr in repo.pulls.values()):
+        return _Reply(422, {"message": f"A pull request already exists for {head}."})
+    if repo.refs[f"heads/{head}"] == repo.refs[f"heads/{base}"]:
+        return _Reply(422, {"message": f"No commits between {base} and {head}"})
+    number = repo.open_pull(head, body.get("title"), body.get("body") or "")
+    return _Reply(201, repo.pull_json(fake.api_base(repo), repo.pulls[number]))
+
+
+@route("PUT", REPO + r"/pulls/(?P<number>\d+)/merge")
+def merge_pull(fake, repo, query, body, headers, number):
+    pr = repo.pulls.get(int(number))
+    if pr is None:
+        return _Reply(404, {"message": "Not Found"})
+    if pr["state"] != "open":
+        return _Reply(405, {"message": "Pull Request is not mergeable"})
+    if pr["head"] in repo.merge_conflicts:
+        return _Reply(405, {"message": "Merge conflict"})
+    base_sha = repo.refs[f"heads/{pr['base']}"]
+    files = dict(repo.files_at(base_sha))
+    files.update(repo.files_at(pr["head"]))
+    message = (body or {}).get("commit_title") or pr["title"]
+    if (body or {}).get("merge_method") == "squash":
+        # GitHub's default squash message lists the squashed commits.
+        squashed = []
+        sha = repo.resolve(pr["head"])
+        merged = _ancestors(repo, base_sha)
+        while sha and sha not in merged:
+            squashed.append(repo.commits[sha]["message"].partition("\n")[0])
+            parents = repo.commits[sha]["parents"]
+            sha = parents[0] if parents else None
+        message += "\n\n" + "\n\n".join(f"* {m}" for m in reversed(squashed))
+    sha = repo.commit(files, [base_sha], message)
+    repo.refs[f"heads/{pr['base']}"] = sha
+    pr.update(state="closed", merged=True, merge_commit_sha=sha)
+    return {"sha": sha, "merged": True, "message": "Pull Request successfully merged"}
+
+
+@route("PATCH", REPO + r"/(?:pulls|issues)/(?P<number>\d+)")
+def update_pull(fake, repo, query, body, headers, number):
+    pr = repo.pulls.get(int(number))
+    if pr is None:
+        return _Reply(404, {"message": "Not Found"})
+    pr.update({k: v for k, v in body.items() if k in ("state", "title", "body")})
+    return repo.pull_json(fake.api_base(repo), pr)
+
+
+@route("POST", REPO + r"/issues/(?P<number>\d+)/comments")
+def add_comment(fake, repo, query, body, headers, number):
+    return _Reply(201, {"id": int(number), "body": body["body"]})
+
+
+@route("GET", REPO + "/contents/(?P<path>.+)")
+def get_contents(fake, repo, query, body, headers, path):
+    files = repo.files_at(query.get("ref", repo.main_branch))
+    if files is None or path not in files:
+        return _Reply(404, {"message": "Not Found"})
+    text = files[path]
+    if "raw" in headers.get("Accept", "") or query.get("raw"):
+        return text
+    return {
+        "path": path, "sha": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+        "content": base64.b64encode(text.encode("utf-8")).decode("ascii"), "encoding": "base64",
+        "download_url": f"{fake.api_base(repo)}/contents/{path}?ref={query.get('ref', repo.main_branch)}&raw=1",
+    }
+
+
+@route("PUT", REPO + "/contents/(?P<path>.+)")
+def put_contents(fake, repo, query, body, headers, path):
+    text = base64.b64decode(body["content"]).decode("utf-8")
+    sha = repo.add_commit(body["branch"], {path: text}, body["message"])
+    return {"commit": {"sha": sha}}
+
+
+@route("GET", REPO + "/tarball/(?P<ref>.+)")
+def get_tarball(fake, repo, query, body, headers, ref):
+    if repo.resolve(ref) is None:
+        return _Reply(404, {"message": "Not Found"})
+    return _Reply(200, repo.tarball(ref), {"Content-Type": "application/x-gzip"})
+
+
+@route("GET", REPO + r"/compare/(?P<base>.+?)\.\.\.(?P<head>.+)")
+def compare(fake, repo, query, body, headers, base, head):
+    base_sha, head_sha = repo.resolve(base), repo.resolve(head)
+    if base_sha is None or head_sha is None:
+        return _Reply(404, {"message": "Not Found"})
+    ahead, todo, seen = [], [head_sha], set()
+    while todo:  # first-parent walk is enough for the linear histories we build
+        sha = todo.pop()
+        if sha == base_sha or sha in seen:
+            continue
+        seen.add(sha)
+        ahead.append(sha)
+        todo.extend(repo.commits[sha]["parents"][:1])
+    ahead.reverse()
+    return {
+        "status": "ahead" if ahead else "identical", "ahead_by": len(ahead), "total_commits": len(ahead),
+        "commits": [_commit_json(repo, sha) for sha in _paginate(ahead, query)],
+    }
+
+
+# -- GraphQL -------------------------------------------------------------------
+@route("POST", "/graphql")
+def graphql(fake, repo, query, body, headers):
+    m = re.search(r"query\s+(\w+)", body["query"])
+    variables = body.get("variables") or {}
+    repo = fake.repos.get((variables.get("owner"), variables.get("name")))
+    if repo is None:
+        return {"data": {"repository": None}, "errors": [{"type": "NOT_FOUND", "message": "Could not resolve to a Repository"}]}
+    with repo._lock:
+        resolver = _GRAPHQL.get(m.group(1) if m else None)
+        if resolver is None:
+            return {"errors": [{"message": f"Unsupported operation {m and m.group(1)}"}]}
+        return {"data": {"repository": resolver(repo, variables)}}
+
+
+def _connection(items, first, after):
+    start = int(after) if after else 0
+    page = items[start:start + first]
+    end = start + len(page)
+    return {"pageInfo": {"hasNextPage": end < len(items), "endCursor": str(end)}, "nodes": page}
+
+
+def _blobs(repo, variables):
+    result = {}
+    for key, expression in variables.items():
+        if re.fullmatch(r"e\d+", key):
+            ref, _, path = expression.partition(":")
+            files = repo.files_at(ref) or {}
+            if path not in files:
+                result[f"f{key[1:]}"] = None
+                continue
+            text = files[path]
+            truncated = len(text.encode("utf-8")) > GRAPHQL_BLOB_LIMIT
+            result[f"f{key[1:]}"] = {"text": text[:GRAPHQL_BLOB_LIMIT] if truncated else text, "isTruncated": truncated}
+    return result
+
+
+def _snapshot(repo, variables):
+    first = variables["pageSize"]
+    result = _blobs(repo, variables)
+    if variables.get("withBranches"):
+        nodes = [{"name": r[len("heads/"):], "target": {"oid": sha}} for r, sha in sorted(repo.refs.items()) if r.startswith("heads/")]
+        result["branches"] = _connection(nodes, first, variables.get("branchCursor"))
+    if variables.get("withTags"):
+        nodes = [{"name": r[len("tags/"):], "target": {"oid": sha}} for r, sha in sorted(repo.refs.items()) if r.startswith("tags/")]
+        result["tags"] = _connection(nodes, first, variables.get("tagCursor"))
+    if variables.get("withPulls"):
+        nodes = [
+            {"number": pr["number"], "title": pr["title"], "body": pr["body"],
+             "url": f"https://github.invalid/{repo.owner}/{repo.name}/pull/{pr['number']}",
+             "headRefName": pr["head"], "headRefOid": repo.refs.get(f"heads/{pr['head']}")}
+            for pr in repo.pulls.values() if pr["state"] == "open" and pr["base"] == variables["base"]
+        ]
+        result["pullRequests"] = _connection(nodes, first, variables.get("pullCursor"))
+    return result
+
+
+_GRAPHQL = {"RepoSnapshot": _snapshot, "BlobTexts": _blobs}
+
+
+# -- Synthetic repos -------------------------------------------------------------
+def synthetic_changelog(size_bytes):
+    """A changelog of plausible entries, about ``size_bytes`` long."""
+    parts, total, minor = ["# Changelog\n"], 0, 0
+    while total < size_bytes:
+        items = "".join(f"- Change {minor}.{i}: adjust the pipeline and its tests\n" for i in range(20))
+        entry = f"\n## v0.1.{minor} - 2024-01-01\n\n{items}"
+        parts.append(entry)
+        total += len(entry)
+        minor += 1
+    return "".join(parts)
+
+
+def synthetic_repo(owner="bench", name="repo", branches=2000, pulls=1000, tags=500, history=300,
+                   changelog_bytes=4 * 1024 * 1024, version="0.2.0", init_path="demo_package/__init__.py",
+                   changelog_path="CHANGELOG.md"):
+    """A repo with many branches, open PRs and tags, a long history and a large changelog.
+
+    Branches are named ``feature/NNNNN`` so they never look like sprint
+    branches; the first ``pulls`` of them have open PRs against main. Tags
+    ``v0.1.N`` all point at the root commit.
+    """
+    repo = FakeRepo(owner, name, {
+        init_path: f'__version__ = "{version}"\n',
+        changelog_path: synthetic_changelog(changelog_bytes),
+        "README.md": "# bench\n",
+    })
+    root = repo.refs[f"heads/{repo.main_branch}"]
+    for i in range(history):
+        repo.add_commit(repo.main_branch, {"src/app.py": f"VERSION = {i}\n"}, f"Change {i} (#{10000 + i})")
+    for i in range(branches):
+        branch = f"feature/{i:05d}"
+        repo.refs[f"heads/{branch}"] = repo.refs[f"heads/{repo.main_branch}"]
+        if i < pulls:
+            repo.open_pull(branch, f"Feature {i}")
+    for i in range(tags):
+        repo.refs[f"tags/v0.1.{i}"] = root
+    return repo
@@ -0,0 +1,97 @@
+"""Cold-start benchmark for the biweekly_release Lambda handler.
+
+Each sample runs in a fresh interpreter, like a cold Lambda container, and
+records:
+
+* ``import_ms``: cumulative ``-X importtime`` cost of ``import biweekly_release``
+* ``skip_day_ms``: wall time to import the module and have ``main()`` return
+  on a day that is not a release day
+* the HTTP modules that the skip-day path imported (this should be none)
+
+Usage::
+
+    python benchmarks/import_time.py --runs 20
+    python benchmarks/import_time.py --max-skip-day-ms 80   # exit 1 above budget
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+
+from common import child_env
+
+HTTP_MODULES = ("requests", "urllib3", "charset_normalizer", "idna", "certifi", "http.client")
+
+SKIP_DAY_SCRIPT = f"""
+import json, sys, time
+from datetime import timedelta
+preloaded = set(sys.modules)  # site hooks may import some of these at start-up
+start = time.perf_counter()
+import biweekly_release as release
+release.today = release.START_DATE + timedelta(weeks=1)
+release.main()
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [m for m in {HTTP_MODULES!r} if m in sys.modules and m not in preloaded]
+print(json.dumps({{"skip_day_ms": elapsed, "http_modules": loaded}}))
+"""
+
+
+def _env(transport):
+    env = child_env(GITHUB_HTTP_TRANSPORT=transport)
+    env.setdefault("API_BASE", "https://api.github.com/repos/example/example")
+    return env
+
+
+def import_ms(transport):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import biweekly_release"],
+        env=_env(transport), capture_output=True, text=True, check=True,
+    )
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*biweekly_release$", line)
+        if m:
+            return int(m.group(1)) / 1000
+    raise RuntimeError("biweekly_release missing from -X importtime output")
+
+
+def skip_day(transport):
+    proc = subprocess.run(
+        [sys.executable, "-c", SKIP_DAY_SCRIPT],
+        env=_env(transport), capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure(runs, transport):
+    imports = [import_ms(transport) for _ in range(runs)]
+    skips = [skip_day(transport) for _ in range(runs)]
+    loaded = sorted({m for s in skips for m in s["http_modules"]})
+    return {
+        "transport": transport,
+        "runs": runs,
+        "import_ms_median": round(statistics.median(imports), 2),
+        "skip_day_ms_median": round(statistics.median(s["skip_day_ms"] for s in skips), 2),
+        "skip_day_ms_max": round(max(s["skip_day_ms"] for s in skips), 2),
+        "skip_day_http_modules": loaded,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--transport", choices=("auto", "requests", "urllib"), default="auto")
+    parser.add_argument("--max-skip-day-ms", type=float, help="fail if the median skip-day time exceeds this")
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs, args.transport)
+    print(json.dumps(result, indent=2))
+    failed = bool(result["skip_day_http_modules"])
+    if args.max_skip_day_ms is not None and result["skip_day_ms_median"] > args.max_skip_day_ms:
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
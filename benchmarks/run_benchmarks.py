@@ -0,0 +1,284 @@
+"""End-to-end benchmarks for biweekly_release.main() against a fake GitHub.
+
+Each scenario builds a fresh synthetic repo (thousands of branches, open PRs
+and tags, a multi-MB changelog) on a local ``FakeGitHub`` and runs
+``biweekly_release.main()`` once in a fresh interpreter pointed at it.
+Per scenario it reports:
+
+* ``wall_ms``: import plus ``main()``, measured in the child
+* ``requests`` and ``bytes`` (both directions), as counted by the fake
+* ``peak_rss_kb``: the child's peak resident set size
+
+After the measured run, the repo the fake holds is checked against the
+scenario's ``Expected`` state: each sprint branch's version and PR state,
+main's version, the release tags, and whether the run wrote anything.
+
+Results are compared against ``baselines.json``. Request counts must not
+grow at all; the other metrics get the tolerances in TOLERANCES. Wall time
+and RSS depend on the machine, so refresh the baselines on the machine that
+runs the comparison.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenario roll-up --runs 5
+    python benchmarks/run_benchmarks.py --update-baselines
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+BASELINES = Path(__file__).resolve().parent / "baselines.json"
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common import child_env  # noqa: E402
+from fake_github import FakeGitHub, Faults, synthetic_repo  # noqa: E402
+
+START_DATE = date(2025, 7, 3)  # biweekly_release.START_DATE
+INIT_PATH = "demo_package/__init__.py"  # biweekly_release.INIT_PATH
+SPRINT_BRANCH = re.compile(r"s\d+test")
+MERGE = "PUT /repos/{repo}/pulls/{number}/merge"
+METRICS = ("wall_ms", "requests", "bytes", "peak_rss_kb")
+TOLERANCES = {"wall_ms": 0.5, "requests": 0.0, "bytes": 0.05, "peak_rss_kb": 0.25}
+
+CHILD_SCRIPT = """
+import json, re, resource, sys, time
+from datetime import date
+start = time.perf_counter()
+import biweekly_release as release
+release.today = date.fromisoformat(sys.argv[1])
+result = release.main({})
+elapsed = (time.perf_counter() - start) * 1000
+try:
+    # ru_maxrss survives exec on Linux and would report the parent's peak.
+    with open("/proc/self/status") as f:
+        rss = int(re.search(r"VmHWM:\\s+(\\d+) kB", f.read()).group(1))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"result": result, "wall_ms": elapsed, "peak_rss_kb": rss}))
+"""
+
+
+@dataclass
+class Expected:
+    """Repo state a scenario must leave behind."""
+
+    main_version: str
+    sprints: dict = field(default_factory=dict)  # sprint branch -> (its version, its PR's state)
+    writes: bool = True  # False: the measured run may only read
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    today: date
+    expected_status: str
+    expected: Expected
+    bootstrapped: bool = False  # run a bootstrap first, then add a sprint's worth of commits
+    merge_conflict: bool = False
+    rerun: bool = False  # run once on ``today`` first, so the measured run is a same-cycle rerun
+    late_errors: tuple = ()  # endpoints that 502 after applying a write, during the measured run
+
+
+ROLL_UP_DAY = START_DATE + timedelta(weeks=2)
+BOOTSTRAPPED = Expected("0.2.0", {"s3test": ("0.3.0", "open")})
+ROLLED_UP = Expected("0.3.0", {"s3test": ("0.3.0", "merged"), "s4test": ("0.4.0", "open")})
+MERGE_FAILED = Expected("0.2.0", {"s3test": ("0.3.0", "closed"), "s4test": ("0.4.0", "open")})
+
+SCENARIOS = [
+    Scenario("bootstrap", "first run: no sprint branches yet", START_DATE, "released", BOOTSTRAPPED),
+    Scenario("roll-up", "merge last sprint's PR, cut the next sprint", ROLL_UP_DAY, "released", ROLLED_UP,
+             bootstrapped=True),
+    Scenario("rerun", "second invocation in the same cycle as a roll-up", ROLL_UP_DAY, "up-to-date",
+             Expected(ROLLED_UP.main_version, ROLLED_UP.sprints, writes=False), bootstrapped=True, rerun=True),
+    Scenario("merge-failure", "last sprint's PR conflicts and is closed instead", ROLL_UP_DAY, "released",
+             MERGE_FAILED, bootstrapped=True, merge_conflict=True),
+    Scenario("merge-failure-rerun", "same-cycle rerun after a failed merge", ROLL_UP_DAY, "up-to-date",
+             Expected(MERGE_FAILED.main_version, MERGE_FAILED.sprints, writes=False),
+             bootstrapped=True, merge_conflict=True, rerun=True),
+    Scenario("merge-502", "the merge is applied but GitHub answers 502", ROLL_UP_DAY, "released", ROLLED_UP,
+             bootstrapped=True, late_errors=(MERGE,)),
+    Scenario("skip-day", "off-week invocation", START_DATE + timedelta(weeks=1), "skipped",
+             Expected("0.2.0", writes=False)),
+]
+
+
+def run_child(fake, repo, today, transport):
+    env = child_env(
+        API_BASE=fake.api_base(repo),
+        GRAPHQL_URL=f"{fake.url}/graphql",
+        GIT_PAT="benchmark",
+        GITHUB_HTTP_TRANSPORT=transport,
+    )
+    env.pop("GITHUB_CACHE_DIR", None)
+    env.pop("CHANGELOG_SHARD_DIR", None)
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, today.isoformat()],
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"biweekly_release failed:\n{proc.stdout[-2000:]}{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def add_sprint_work(repo, branch, commits=150, direct=50):
+    """Commits landed during a sprint: on the sprint branch and straight to main."""
+    for i in range(commits):
+        repo.add_commit(branch, {f"src/feature_{i % 10}.py": f"STEP = {i}\n"}, f"Sprint change {i}")
+    for i in range(direct):
+        repo.add_commit(repo.main_branch, {"src/hotfix.py": f"FIX = {i}\n"}, f"Hotfix {i} (#{20000 + i})")
+
+
+def _version_at(repo, ref):
+    m = re.search(r'__version__\s*=\s*"([\d.]+)"', repo.files_at(ref)[INIT_PATH])
+    return m.group(1) if m else None
+
+
+def _pull_state(pr):
+    if pr is None:
+        return None
+    return "merged" if pr["merged"] else pr["state"]
+
+
+def check_state(scenario, fake, repo):
+    """Raise unless the run left ``repo`` in ``scenario.expected``'s state."""
+    expected = scenario.expected
+    problems = []
+    main_version = _version_at(repo, repo.main_branch)
+    if main_version != expected.main_version:
+        problems.append(f"main at {main_version}, expected {expected.main_version}")
+    pulls = [pr for pr in repo.pulls.values() if SPRINT_BRANCH.fullmatch(pr["head"])]
+    duplicates = sorted(head for head, n in Counter(pr["head"] for pr in pulls).items() if n > 1)
+    if duplicates:
+        problems.append(f"more than one PR for {', '.join(duplicates)}")
+    by_head = {pr["head"]: pr for pr in pulls}
+    branches = [ref[len("heads/"):] for ref in repo.refs
+                if ref.startswith("heads/") and SPRINT_BRANCH.fullmatch(ref[len("heads/"):])]
+    sprints = {b: (_version_at(repo, b), _pull_state(by_head.get(b))) for b in sorted(branches)}
+    if sprints != expected.sprints:
+        problems.append(f"sprint branches {sprints}, expected {expected.sprints}")
+    missing = sorted(f"v{version}" for version, _ in expected.sprints.values() if f"tags/v{version}" not in repo.refs)
+    if missing:
+        problems.append(f"missing tags {', '.join(missing)}")
+    writes = sorted(e for e in fake.stats.by_endpoint if not (e.startswith("GET ") or e == "POST /graphql"))
+    if writes and not expected.writes:
+        problems.append(f"expected a read-only run, got {', '.join(writes)}")
+    if scenario.late_errors and not fake.stats.injected_errors:
+        problems.append(f"no late 502 was injected on {', '.join(scenario.late_errors)}")
+    if problems:
+        raise RuntimeError(f"{scenario.name}: " + "; ".join(problems))
+
+
+def run_scenario(scenario, args):
+    faults = Faults(latency=args.latency_ms / 1000, error_rate=args.error_rate, write_error_rate=args.write_error_rate,
+                    late_error_rate=args.late_error_rate, rate_limit_rate=args.rate_limit_rate)
+    with FakeGitHub(faults) as fake:
+        repo = fake.add_repo(synthetic_repo(
+            branches=args.branches, pulls=args.pulls, tags=args.tags,
+            changelog_bytes=int(args.changelog_mb * 1024 * 1024),
+        ))
+        if scenario.bootstrapped:
+            run_child(fake, repo, START_DATE, args.transport)
+            sprint_branch = next(r[len("heads/"):] for r in repo.refs if r.startswith("heads/s"))
+            add_sprint_work(repo, sprint_branch)
+            if scenario.merge_conflict:
+                repo.merge_conflicts.add(sprint_branch)
+        if scenario.rerun:
+            run_child(fake, repo, scenario.today, args.transport)
+        fake.faults.late_error_endpoints = scenario.late_errors
+        fake.reset_stats()
+        child = run_child(fake, repo, scenario.today, args.transport)
+        status = child["result"]["status"]
+        if status != scenario.expected_status:
+            raise RuntimeError(f"{scenario.name}: expected status {scenario.expected_status!r}, got {status!r}")
+        check_state(scenario, fake, repo)
+        return {
+            "wall_ms": child["wall_ms"],
+            "requests": fake.stats.requests,
+            "bytes": fake.stats.bytes_in + fake.stats.bytes_out,
+            "peak_rss_kb": child["peak_rss_kb"],
+        }
+
+
+def measure(scenario, args):
+    samples = [run_scenario(scenario, args) for _ in range(args.runs)]
+    return {metric: round(statistics.median(s[metric] for s in samples), 1) for metric in METRICS}
+
+
+def params(args):
+    keys = ("branches", "pulls", "tags", "changelog_mb", "transport", "latency_ms", "error_rate", "write_error_rate",
+            "late_error_rate", "rate_limit_rate")
+    return {k: getattr(args, k) for k in keys}
+
+
+def regressions(name, result, baseline):
+    found = []
+    for metric in METRICS:
+        if metric not in baseline:
+            continue
+        limit = baseline[metric] * (1 + TOLERANCES[metric])
+        if result[metric] > limit:
+            found.append(f"{name}: {metric} {result[metric]:g} > baseline {baseline[metric]:g} (+{TOLERANCES[metric]:.0%})")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS],
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--transport", choices=("auto", "requests", "urllib"), default="urllib")
+    parser.add_argument("--branches", type=int, default=2000)
+    parser.add_argument("--pulls", type=int, default=1000)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--changelog-mb", type=float, default=4.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every fake request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance of a 502 on a read")
+    parser.add_argument("--write-error-rate", type=float, default=0.0,
+                        help="chance of a 502 on a write, before it is applied")
+    parser.add_argument("--late-error-rate", type=float, default=0.0,
+                        help="chance of a 502 on a write, after it is applied")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="chance of a secondary rate limit")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    results = {s.name: measure(s, args) for s in scenarios}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scenario':<21}{'wall ms':>10}{'requests':>10}{'bytes':>12}{'peak RSS KB':>13}")
+        for name, r in results.items():
+            print(f"{name:<21}{r['wall_ms']:>10.1f}{r['requests']:>10.0f}{r['bytes']:>12,.0f}{r['peak_rss_kb']:>13,.0f}")
+
+    stored = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    if args.update_baselines:
+        scenarios_stored = stored.get("scenarios", {}) if stored.get("params") == params(args) else {}
+        scenarios_stored.update(results)
+        BASELINES.write_text(json.dumps({"params": params(args), "scenarios": scenarios_stored}, indent=2) + "\n")
+        print(f"Baselines written to {BASELINES}")
+        return 0
+    if stored.get("params") != params(args):
+        print("No baselines for these parameters; skipping the regression check.")
+        return 0
+    found = []
+    for name, result in results.items():
+        if name in stored["scenarios"]:
+            found += regressions(name, result, stored["scenarios"][name])
+    for line in found:
+        print(f"REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
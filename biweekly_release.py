@@ -1,281 +1,1487 @@
 import os
 import re
 import json
-from datetime import date
+from datetime import date, timedelta
 from pathlib import Path
-import requests
-import tarfile
-import io
-import base64
-import shutil
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# Most invocations are skip days that return right after is_release_day(),
+# so the HTTP stack, hashing and thread pools are imported where
+# they are first used rather than here.
 
 # --- CONFIG ---
-REPO_PATH = Path("/tmp/cicd-rollup-automation-demo")
 INIT_PATH = Path("demo_package/__init__.py")
+CHANGELOG_PATH = Path("CHANGELOG.md")
+CHANGELOG_SHARD_DIR = Path(os.environ["CHANGELOG_SHARD_DIR"]) if os.getenv("CHANGELOG_SHARD_DIR") else None  # e.g. "changelog": one file per release year
 SPRINT_BRANCH_PREFIX = "s"
 MAIN_BRANCH = "main"
 START_DATE = date(2025, 7, 3)
 
 GITHUB_TOKEN = os.getenv("GIT_PAT")
 API_BASE = os.getenv("API_BASE")  # e.g. https://api.github.com/repos/aemoryan/cicd-rollup-automation-demo
+GRAPHQL_URL = os.getenv("GRAPHQL_URL")  # derived from API_BASE when unset
 HEADERS = {
     "Authorization": f"token {GITHUB_TOKEN}",
     "Accept": "application/vnd.github+json"
 }
 today = date.today()
+FLEET_MAX_WORKERS = int(os.getenv("FLEET_MAX_WORKERS", "8"))
+FLEET_MIN_REMAINING_MS = 60_000  # don't start another repo with less Lambda time left than this
+PLAN_MAX_WORKERS = 4  # independent plan operations applied concurrently per repo
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "BiweeklyRelease")  # CloudWatch EMF namespace; empty disables
+
+# --- HTTP CLIENT ---
+HTTP_TIMEOUT = (10, 60)  # (connect, read) seconds
+HTTP_TRANSPORT = os.getenv("GITHUB_HTTP_TRANSPORT", "auto")  # "requests", "urllib" or "auto"
+POOL_MAXSIZE = int(os.getenv("GITHUB_POOL_MAXSIZE", "16"))
+MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "4"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+MAX_RATE_LIMIT_WAIT = 300  # never sleep longer than this on a single rate limit
+RETRY_STATUSES = {500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}  # PUT/DELETE endpoints like /pulls/N/merge aren't safe to replay
+RATE_LIMIT_RESERVE = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "10"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("GITHUB_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+HTTP_CACHE_DIR = os.getenv("GITHUB_CACHE_DIR")  # e.g. /tmp/github-http-cache; disk tier off when unset
+HTTP_CACHE_DISK_MAX_BYTES = int(os.getenv("GITHUB_CACHE_DISK_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class HTTPCache:
+    """Conditional-request cache for GET responses.
+
+    Entries keep the body with its ``ETag``/``Last-Modified`` validators and
+    are always revalidated, so a hit costs a 304 (which GitHub does not count
+    against the rate limit) rather than serving stale data. An in-process LRU
+    tier is bounded by ``max_bytes``; an optional on-disk tier under
+    ``directory`` survives across invocations of a warm container (or a
+    mounted EFS volume) and evicts least recently used files past
+    ``disk_max_bytes``.
+    """
+
+    def __init__(self, max_bytes=HTTP_CACHE_MAX_BYTES, directory=HTTP_CACHE_DIR,
+                 disk_max_bytes=HTTP_CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(url, headers):
+        vary = f"{url}\n{headers.get('Accept', '')}\n{headers.get('Authorization', '')}"
+        import hashlib
+
+        return hashlib.sha256(vary.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def _remember(self, key, entry):
+        size = len(entry["body"])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old["body"])
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted["body"])
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self.directory / key
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            os.utime(path)  # mtime doubles as the LRU clock
+        except (OSError, ValueError):
+            return None
+        return {**meta, "body": body}
+
+    def _write_disk(self, key, entry):
+        if not self.directory or len(entry["body"]) > self.disk_max_bytes:
+            return
+        meta = {k: v for k, v in entry.items() if k != "body"}
+        tmp = self.directory / f".{key}.{threading.get_ident()}"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(json.dumps(meta).encode("utf-8") + b"\n")
+                f.write(entry["body"])
+            os.replace(tmp, self.directory / key)
+            self._evict_disk()
+        except OSError as e:
+            log(f"HTTP cache write failed: {e}")
+
+    def _evict_disk(self):
+        files = [(p.stat(), p) for p in self.directory.iterdir() if not p.name.startswith(".")]
+        total = sum(st.st_size for st, _ in files)
+        for st, p in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.disk_max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= st.st_size
+
+
+class RateLimitBudget:
+    """Rate-limit state shared by every thread using a client.
+
+    All repos in a fleet run share one token, and therefore one budget. Once
+    any response shows the budget is down to ``reserve`` (or a secondary
+    limit pauses us), every thread holds off until GitHub resets it, rather
+    than each one discovering the limit through its own 403.
+    """
+
+    def __init__(self, reserve=RATE_LIMIT_RESERVE):
+        self.reserve = reserve
+        self._limits = {}  # X-RateLimit-Resource -> (remaining, reset epoch)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resource(url):
+        return "graphql" if url.endswith("/graphql") else "core"
+
+    def wait(self, url):
+        """Block until the shared budget allows a request to ``url``."""
+        now = time.time()
+        with self._lock:
+            until = self._paused_until
+            remaining, reset = self._limits.get(self.resource(url), (None, 0.0))
+            if remaining is not None and remaining <= self.reserve and reset > now:
+                until = max(until, reset)
+        if until > now:
+            delay = min(until - now, MAX_RATE_LIMIT_WAIT)
+            log(f"Rate-limit budget exhausted; waiting {delay:.1f}s")
+            time.sleep(delay)
+
+    def observe(self, r):
+        remaining = r.headers.get("X-RateLimit-Remaining")
+        reset = r.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        resource = r.headers.get("X-RateLimit-Resource", "core")
+        with self._lock:
+            self._limits[resource] = (int(remaining), float(reset))
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+
+class GitHubHTTPError(Exception):
+    """A 4xx/5xx response from GitHub; ``response`` is the ``Response``."""
+
+    def __init__(self, message, response):
+        super().__init__(message)
+        self.response = response
+
+
+class TransportError(Exception):
+    """The request never produced a response (connection refused, reset, timed out)."""
+
+
+class Headers(dict):
+    """Case-insensitive header mapping."""
+
+    def __init__(self, items=()):
+        super().__init__()
+        self.update(items)
+
+    def update(self, items=()):
+        for key, value in dict(items).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key.lower(), value)
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.lower())
+
+    def __contains__(self, key):
+        return super().__contains__(key.lower())
+
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+
+class Response:
+    """Transport-neutral HTTP response with a fully read body."""
+
+    def __init__(self, status_code, headers, url, content=b"", reason=""):
+        self.status_code = status_code
+        self.headers = Headers(headers)
+        self.url = url
+        self.reason = reason
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        charset = re.search(r"charset=([\w-]+)", self.headers.get("Content-Type", ""))
+        return self.content.decode(charset.group(1) if charset else "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise GitHubHTTPError(f"{self.status_code} {self.reason} for url: {self.url}", self)
+
+
+class RequestsTransport:
+    """Transport on the vendored ``requests``/``urllib3`` stack, with a pooled session."""
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def send(self, method, url, headers, body, timeout):
+        try:
+            r = self.session.request(method, url, headers=headers, data=body, timeout=timeout)
+            return Response(r.status_code, r.headers, r.url, content=r.content, reason=r.reason)
+        except self._errors as e:
+            raise TransportError(f"{type(e).__name__}: {e}") from e
+
+
+class UrllibTransport:
+    """Stdlib-only transport on ``http.client``.
+
+    Keeps one keep-alive connection per host per thread, follows redirects
+    (dropping ``Authorization`` when the host changes) and accepts
+    gzip-compressed bodies. It lets the Lambda package ship without the
+    vendored ``requests`` stack.
+    """
+
+    MAX_REDIRECTS = 5
+
+    def __init__(self):
+        import http.client
+
+        self._http = http.client
+        self._local = threading.local()
+
+    def _connections(self):
+        if not hasattr(self._local, "connections"):
+            self._local.connections = {}
+        return self._local.connections
+
+    def _drop(self, key):
+        conn = self._connections().pop(key, None)
+        if conn is not None:
+            conn.close()
+
+    def _send_once(self, method, parts, headers, body, timeout):
+        key = (parts.scheme, parts.netloc)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        for attempt in range(2):
+            conn = self._connections().get(key)
+            reused = conn is not None
+            if conn is None:
+                cls = self._http.HTTPSConnection if parts.scheme == "https" else self._http.HTTPConnection
+                conn = self._connections()[key] = cls(parts.netloc, timeout=timeout)
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                return key, conn.getresponse()
+            except (self._http.HTTPException, OSError) as e:
+                self._drop(key)
+                # The server may have closed an idle keep-alive connection; retry once on a fresh one.
+                stale = isinstance(e, (self._http.RemoteDisconnected, ConnectionResetError, BrokenPipeError))
+                if not (reused and stale and attempt == 0):
+                    raise TransportError(f"{type(e).__name__}: {e}") from e
+
+    def send(self, method, url, headers, body, timeout):
+        from urllib.parse import urljoin, urlsplit
+
+        if isinstance(timeout, tuple):
+            timeout = max(timeout)
+        headers = dict(headers)
+        headers.setdefault("Accept-Encoding", "gzip")
+        for _ in range(self.MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            key, resp = self._send_once(method, parts, headers, body, timeout)
+            location = resp.getheader("Location")
+            if resp.status not in (301, 302, 303, 307, 308) or not location:
+                break
+            resp.read()
+            url = urljoin(url, location)
+            if urlsplit(url).netloc != parts.netloc:
+                headers = {k: v for k, v in headers.items() if k.lower() != "authorization"}
+            if resp.status == 303 or (resp.status in (301, 302) and method == "POST"):
+                method, body = "GET", None
+        try:
+            content = resp.read()
+        except (self._http.HTTPException, OSError) as e:
+            self._drop(key)
+            raise TransportError(f"{type(e).__name__}: {e}") from e
+        if resp.getheader("Content-Encoding") == "gzip":
+            import gzip
+
+            content = gzip.decompress(content)
+        headers = [(k, v) for k, v in resp.getheaders() if k.lower() not in ("content-encoding", "content-length")]
+        return Response(resp.status, headers, url, content=content, reason=resp.reason)
+
+
+def make_transport(kind=HTTP_TRANSPORT):
+    """Build the transport named by ``kind``: "requests", "urllib" or "auto"."""
+    if kind == "auto":
+        import importlib.util
+
+        kind = "requests" if importlib.util.find_spec("requests") else "urllib"
+    if kind == "requests":
+        return RequestsTransport()
+    if kind == "urllib":
+        return UrllibTransport()
+    raise ValueError(f"Unknown HTTP transport {kind!r}")
+
+
+class GitHubClient:
+    """Long-lived GitHub API client.
+
+    Sends requests through a pooled, keep-alive ``transport`` that is reused
+    across calls (and across warm Lambda invocations). Transient 5xx
+    responses and primary/secondary rate limits are retried with jittered
+    exponential backoff, honoring ``Retry-After`` and ``X-RateLimit-Reset``.
+    GETs go through ``cache`` when one is configured. The client
+    is thread-safe and shares one ``RateLimitBudget`` across threads.
+    """
+
+    def __init__(self, headers=None, max_retries=MAX_RETRIES, cache=None, transport=None):
+        self.headers = dict(headers or {})
+        self.transport = transport or make_transport()
+        self.max_retries = max_retries
+        self.cache = cache
+        self.budget = RateLimitBudget()
+
+    def request(self, method, url, json=None, headers=None, timeout=HTTP_TIMEOUT, idempotent=None):
+        """Send a request, retrying transient failures.
+
+        ``idempotent`` overrides the method-based default, e.g. for GraphQL
+        queries, which are POSTs but safe to replay.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        headers = {**self.headers, **(headers or {})}
+        body = None
+        if json is not None:
+            body = _encode_json(json)
+            headers["Content-Type"] = "application/json"
+        cache_key = entry = None
+        if self.cache is not None and method == "GET":
+            cache_key = HTTPCache.key(url, headers)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+        tracer = current_tracer()
+        span = tracer.start(f"{method} {endpoint_template(url)}")
+        span.bytes_out = len(body or b"")
+        try:
+            r = self._send(method, url, headers, body, timeout, idempotent, span)
+            span.observe(r)
+        except Exception as e:
+            tracer.finish(span, e)
+            raise
+        tracer.finish(span)
+        return self._through_cache(cache_key, entry, r)
+
+    def _send(self, method, url, headers, body, timeout, idempotent, span):
+        attempt = 0
+        while True:
+            self.budget.wait(url)
+            try:
+                r = self.transport.send(method, url, headers, body, timeout)
+            except TransportError as e:
+                # A POST may have reached GitHub before the connection dropped.
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = _backoff_delay(attempt)
+                log(f"{method} {url} -> {e}; retrying in {delay:.1f}s")
+            else:
+                self.budget.observe(r)
+                delay = self._retry_delay(idempotent, r, attempt)
+                if delay is None:
+                    return r
+                log(f"{method} {url} -> {r.status_code}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            span.retries = attempt
+
+    def _through_cache(self, cache_key, entry, r):
+        if cache_key is None:
+            return r
+        if r.status_code == 304 and entry is not None:
+            return _cached_response(r, entry)
+        if r.status_code == 200 and ("ETag" in r.headers or "Last-Modified" in r.headers):
+            self.cache.put(cache_key, {
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "headers": {"Content-Type": r.headers.get("Content-Type", "")},
+                "body": r.content,
+            })
+        return r
+
+    def _retry_delay(self, idempotent, r, attempt):
+        """Seconds to wait before retrying ``r``, or None if it should be returned as is."""
+        if attempt >= self.max_retries:
+            return None
+        if _is_rate_limited(r):
+            # Rate-limited requests were never processed, so every method is safe to replay.
+            delay = _rate_limit_delay(r, attempt)
+            self.budget.pause(delay)
+            return delay
+        if r.status_code in RETRY_STATUSES and idempotent:
+            return _retry_after(r) or _backoff_delay(attempt)
+        return None
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+
+def _encode_json(payload):
+    return json.dumps(payload).encode("utf-8")
+
+
+def _cached_response(not_modified, entry):
+    """Turn a 304 into the 200 it stands for, using the cached body."""
+    headers = Headers(entry["headers"])
+    # Fresh rate-limit and validator headers, minus those describing the empty 304 body.
+    headers.update({
+        k: v for k, v in not_modified.headers.items()
+        if k.lower() not in ("content-length", "content-encoding", "transfer-encoding")
+    })
+    return Response(200, headers, not_modified.url, content=entry["body"], reason="OK")
+
+
+def _backoff_delay(attempt):
+    """Full-jitter exponential backoff."""
+    import random
+
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _retry_after(r):
+    value = r.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return min(float(value), MAX_RATE_LIMIT_WAIT)
+    except ValueError:
+        return None
+
+
+def _is_rate_limited(r):
+    if r.status_code == 429:
+        return True
+    if r.status_code != 403:
+        return False
+    if r.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in r.headers:
+        return True
+    return "rate limit" in r.text.lower()
+
+
+def _rate_limit_delay(r, attempt):
+    retry_after = _retry_after(r)
+    if retry_after is not None:
+        return retry_after
+    reset = r.headers.get("X-RateLimit-Reset")
+    if r.headers.get("X-RateLimit-Remaining") == "0" and reset:
+        import random
+
+        wait = float(reset) - time.time() + random.uniform(0.5, 1.5)
+        return min(max(wait, 1.0), MAX_RATE_LIMIT_WAIT)
+    # Secondary rate limits without a hint: GitHub asks for at least a minute.
+    return min(60.0 + _backoff_delay(attempt), MAX_RATE_LIMIT_WAIT)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the container-wide client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GitHubClient(HEADERS, cache=HTTPCache())
+    return _client
+
+# --- REPO CONTEXT ---
+@dataclass(frozen=True)
+class RepoConfig:
+    """Everything that differs between repos managed by one deployment."""
+
+    api_base: str
+    init_path: Path = INIT_PATH
+    changelog_path: Path = CHANGELOG_PATH
+    changelog_shard_dir: Path = CHANGELOG_SHARD_DIR
+    main_branch: str = MAIN_BRANCH
+    sprint_prefix: str = SPRINT_BRANCH_PREFIX
+    start_date: date = START_DATE
+    graphql_url: str = None
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        for key in ("init_path", "changelog_path", "changelog_shard_dir"):
+            if data.get(key):
+                data[key] = Path(data[key])
+        if isinstance(data.get("start_date"), str):
+            data["start_date"] = date.fromisoformat(data["start_date"])
+        return cls(**data)
+
+    @property
+    def name(self):
+        return "/".join(self.api_base.partition("/repos/")[2].strip("/").split("/")[:2])
+
+
+_current_repo = contextvars.ContextVar("current_repo", default=None)
+
+
+def current_repo():
+    """The repo being released on this thread, defaulting to the module config."""
+    return _current_repo.get() or RepoConfig(API_BASE, graphql_url=GRAPHQL_URL)
+
+
+def log(message):
+    repo = _current_repo.get()
+    line = f"[{repo.name}] {message}" if repo else message
+    # One write per line: print() writes the text and the newline separately,
+    # so lines from fleet, plan and compare threads would run together.
+    print(f"{line}\n", end="")
+
+# --- TRACING ---
+_ENDPOINT_TEMPLATES = [
+    (re.compile(r"^https?://[^/]+(?:/api/v3)?/repos/[^/]+/[^/]+"), "/repos/{repo}"),
+    (re.compile(r"^https?://[^/]+(?:/api)?/graphql$"), "/graphql"),
+    (re.compile(r"/(branches|tarball|zipball)/.+$"), r"/\1/{ref}"),
+    (re.compile(r"/git/(refs?)/(heads|tags)/.+$"), r"/git/\1/\2/{ref}"),
+    (re.compile(r"/git/(commits|trees|tags|blobs)/[0-9a-f]+$"), r"/git/\1/{sha}"),
+    (re.compile(r"/(pulls|issues)/\d+"), r"/\1/{number}"),
+    (re.compile(r"/contents/.+$"), "/contents/{path}"),
+    (re.compile(r"/compare/.+$"), "/compare/{range}"),
+]
+
+
+def endpoint_template(url):
+    """``https://api.github.com/repos/o/r/pulls/7/merge`` -> ``/repos/{repo}/pulls/{number}/merge``."""
+    path = url.partition("?")[0]
+    for pattern, repl in _ENDPOINT_TEMPLATES:
+        path = pattern.sub(repl, path)
+    return path
+
+
+@dataclass
+class Span:
+    """One GitHub request, retries included."""
+
+    name: str  # e.g. "GET /repos/{repo}/branches/{ref}"
+    phase: str = None
+    started: float = 0.0
+    status: int = None
+    ms: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    retries: int = 0
+    rate_limit: dict = field(default_factory=dict)  # X-RateLimit-* values of the final response
+    error: str = None
+
+    def observe(self, r):
+        self.status = r.status_code
+        self.bytes_in = len(r.content)
+        for key in ("Limit", "Remaining", "Used", "Reset", "Resource"):
+            value = r.headers.get(f"X-RateLimit-{key}")
+            if value is not None:
+                self.rate_limit[key.lower()] = int(value) if value.isdigit() else value
+
+    @property
+    def failed(self):
+        return self.error is not None or (self.status or 0) >= 400
+
+
+class Tracer:
+    """Spans and phase timings for one repo's release run."""
+
+    def __init__(self, repo_name=None, enabled=True):
+        self.repo_name = repo_name
+        self.enabled = enabled
+        self.spans = []
+        self.phases = {}  # phase name -> milliseconds
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def start(self, name):
+        return Span(name, phase=_current_phase.get(), started=time.perf_counter())
+
+    def finish(self, span, error=None):
+        span.ms = (time.perf_counter() - span.started) * 1000
+        if error is not None:
+            span.error = type(error).__name__
+        if self.enabled:
+            with self._lock:
+                self.spans.append(span)
+
+    @contextmanager
+    def phase(self, name):
+        token = _current_phase.set(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _current_phase.reset(token)
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def metrics(self):
+        """CloudWatch Embedded Metric Format records summarising the run."""
+        timestamp = int(time.time() * 1000)
+        repo = {"Repo": self.repo_name or ""}
+        with self._lock:
+            spans, phases = list(self.spans), dict(self.phases)
+        records = [_emf(timestamp, repo, {
+            "Duration": ((time.perf_counter() - self.started) * 1000, "Milliseconds"),
+            "Requests": (len(spans), "Count"),
+            "Retries": (sum(s.retries for s in spans), "Count"),
+            "Errors": (sum(s.failed for s in spans), "Count"),
+            "BytesIn": (sum(s.bytes_in for s in spans), "Bytes"),
+            "BytesOut": (sum(s.bytes_out for s in spans), "Bytes"),
+        }, Phases={name: round(ms, 1) for name, ms in phases.items()})]
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span.name, []).append(span)
+        for name, group in sorted(by_name.items()):
+            latencies = sorted(s.ms for s in group)
+            records.append(_emf(timestamp, {**repo, "Endpoint": name}, {
+                "Calls": (len(group), "Count"),
+                "Errors": (sum(s.failed for s in group), "Count"),
+                "Retries": (sum(s.retries for s in group), "Count"),
+                "Bytes": (sum(s.bytes_in + s.bytes_out for s in group), "Bytes"),
+                "LatencyP50": (_percentile(latencies, 50), "Milliseconds"),
+                "LatencyP95": (_percentile(latencies, 95), "Milliseconds"),
+            }, Statuses=sorted({s.status for s in group if s.status is not None})))
+        for name, ms in phases.items():
+            records.append(_emf(timestamp, {**repo, "Phase": name}, {"PhaseDuration": (ms, "Milliseconds")}))
+        resources = {}
+        for span in spans:  # spans complete roughly in order, so the last value per resource is the latest
+            if "remaining" in span.rate_limit:
+                resources[span.rate_limit.get("resource", "core")] = span.rate_limit
+        for resource, rate_limit in sorted(resources.items()):
+            records.append(_emf(timestamp, {**repo, "Resource": resource}, {
+                "RateLimitRemaining": (rate_limit["remaining"], "Count"),
+                "RateLimitUsed": (rate_limit.get("used", 0), "Count"),
+            }, RateLimitReset=rate_limit.get("reset")))
+        return records
+
+    def emit(self):
+        if not (self.enabled and METRICS_NAMESPACE):
+            return
+        # One write, so concurrent fleet runs can't interleave partial records.
+        lines = [json.dumps(record, separators=(",", ":")) for record in self.metrics()]
+        print("\n".join(lines) + "\n", end="", flush=True)
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile, rounded to 0.1ms."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return round(sorted_values[int(rank) - 1], 1)
+
+
+def _emf(timestamp, dimensions, metrics, **properties):
+    return {
+        "_aws": {
+            "Timestamp": timestamp,
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in metrics.items()],
+            }],
+        },
+        **dimensions,
+        **{name: round(value, 1) if isinstance(value, float) else value for name, (value, _) in metrics.items()},
+        **properties,
+    }
+
+
+_NO_TRACER = Tracer(enabled=False)
+_current_tracer = contextvars.ContextVar("current_tracer", default=None)
+_current_phase = contextvars.ContextVar("current_phase", default=None)
+
+
+def current_tracer():
+    return _current_tracer.get() or _NO_TRACER
 
 # --- HELPERS ---
 def is_release_day():
-    return ((today - START_DATE).days // 7) % 2 == 0
+    return ((today - current_repo().start_date).days // 7) % 2 == 0
 
 def github_get(endpoint):
-    r = requests.get(f"{API_BASE}{endpoint}", headers=HEADERS)
+    r = get_client().get(f"{current_repo().api_base}{endpoint}")
     if not r.ok:
-        print(f"GET {endpoint} -> {r.status_code} {r.text}")
+        log(f"GET {endpoint} -> {r.status_code} {r.text}")
     r.raise_for_status()
     return r.json()
 
 def github_post(endpoint, payload):
-    r = requests.post(f"{API_BASE}{endpoint}", headers=HEADERS, json=payload)
+    r = get_client().post(f"{current_repo().api_base}{endpoint}", json=payload)
     if not r.ok:
-        print(f"POST {endpoint} -> {r.status_code} {r.text}")
+        log(f"POST {endpoint} -> {r.status_code} {r.text}")
     r.raise_for_status()
     return r.json()
 
 def github_put(endpoint, payload):
-    r = requests.put(f"{API_BASE}{endpoint}", headers=HEADERS, json=payload)
+    r = get_client().put(f"{current_repo().api_base}{endpoint}", json=payload)
     if not r.ok:
-        print(f"PUT {endpoint} -> {r.status_code} {r.text}")
+        log(f"PUT {endpoint} -> {r.status_code} {r.text}")
     r.raise_for_status()
     return r.json()
 
-def bump_version(content: str):
-    lines = content.splitlines()
-    pattern = r'__version__\s*=\s*"(\d+)\.(\d+)\.(\d+)"'
-    for i, line in enumerate(lines):
-        m = re.search(pattern, line)
-        if m:
-            major, sprint, patch = map(int, m.groups())
-            new_version = f'{major}.{sprint + 1}.0'
-            lines[i] = f'__version__ = "{new_version}"'
-            return sprint + 1, new_version, "\n".join(lines) + "\n"
-    raise RuntimeError("No valid version string found.")
-
-def clone_repo_to_tmp(_branch):
-    url = f"{API_BASE}/tarball/{_branch}"
-    print(f"Downloading repo tarball from {url}")
-    r = requests.get(url, headers=HEADERS)
+def github_patch(endpoint, payload):
+    r = get_client().patch(f"{current_repo().api_base}{endpoint}", json=payload)
+    if not r.ok:
+        log(f"PATCH {endpoint} -> {r.status_code} {r.text}")
     r.raise_for_status()
-    tar_bytes = io.BytesIO(r.content)
-    with tarfile.open(fileobj=tar_bytes, mode="r:gz") as tar:
-        tar.extractall("/tmp/repo")
-    extracted_root = next(
-        (os.path.join("/tmp/repo", d) for d in os.listdir("/tmp/repo") if os.path.isdir(os.path.join("/tmp/repo", d))),
-        None
+    return r.json()
+
+def graphql_url():
+    repo = current_repo()
+    if repo.graphql_url:
+        return repo.graphql_url
+    root = repo.api_base.partition("/repos/")[0]
+    if root.endswith("/api/v3"):  # GitHub Enterprise Server
+        return root[:-len("/v3")] + "/graphql"
+    return f"{root}/graphql"
+
+def repo_owner_and_name():
+    owner, name = current_repo().name.split("/")
+    return owner, name
+
+def github_graphql(query, variables=None):
+    payload = {"query": query, "variables": variables or {}}
+    r = get_client().post(graphql_url(), json=payload, idempotent=True)
+    if not r.ok:
+        log(f"POST /graphql -> {r.status_code} {r.text}")
+    r.raise_for_status()
+    data = r.json()
+    if data.get("errors"):
+        raise RuntimeError(f"GraphQL query failed: {data['errors']}")
+    return data["data"]
+
+def parse_version(init_text):
+    for line in init_text.splitlines():
+        m = re.search(r'"(\d+)\.(\d+)\.(\d+)"', line)
+        if m:
+            return tuple(map(int, m.groups()))
+    raise RuntimeError("Could not determine the version from init.")
+
+def set_version(content, version):
+    """Return ``content`` with its ``__version__`` string replaced by ``version``."""
+    new_content, count = re.subn(
+        r'__version__\s*=\s*"\d+\.\d+\.\d+"', f'__version__ = "{version}"', content, count=1
     )
-    os.chdir(extracted_root)
-    print(f"Repo extracted to {extracted_root}")
-    return extracted_root
+    if not count:
+        raise RuntimeError("No valid version string found.")
+    return new_content
 
-def update_file(path, new_content, commit_message, branch):
-    info = github_get(f"/contents/{path}?ref={branch}")
-    sha = info["sha"]
-    encoded_content = base64.b64encode(new_content.encode("utf-8")).decode("utf-8")
-    payload = {"message": commit_message, "content": encoded_content, "sha": sha, "branch": branch}
-    return github_put(f"/contents/{path}", payload)
 
+class CommitBuilder:
+    """Queue file edits and land them on a branch as one commit.
 
-def clear_tmp_dir():
-    tmp_path = Path("/tmp")
-    for item in tmp_path.iterdir():
-        try:
-            if item.is_file() or item.is_symlink():
-                item.unlink()
-            elif item.is_dir():
-                shutil.rmtree(item)
-        except Exception as e:
-            print(f"Failed to remove {item}: {e}")
-    print("/tmp directory cleared.")
+    Uses the Git Data API, so the cost is a constant five calls (ref, commit,
+    tree, commit, ref update) however many files change, and either every
+    edit lands or none of them does.
+    """
 
-# --- MAIN ---
-def main(event=None, lambda_context=None):
-    if not is_release_day():
-        print("Not a biweekly release day. Skipping.")
-        return
+    def __init__(self, branch):
+        self.branch = branch
+        self.files = {}
 
-    clear_tmp_dir()
-    clone_repo_to_tmp(MAIN_BRANCH)
-    branches = github_get("/branches")
-    branch_names = [b["name"] for b in branches]
+    def add(self, path, content):
+        self.files[Path(path).as_posix()] = content
+        return self
 
-    # --- Determine current sprint ---
-    lines = Path(INIT_PATH).read_text().splitlines()
-    for line in lines:
-        m = re.search(r'"(\d+)\.(\d+)\.(\d+)"', line)
-        if m:
-            _, current_sprint, _ = map(int, m.groups())
-            break
-    else:
-        raise RuntimeError("Could not determine current sprint from init.")
-
-    current_branch = f"{SPRINT_BRANCH_PREFIX}{current_sprint}test"
-    next_sprint = current_sprint + 1
-    next_branch = f"{SPRINT_BRANCH_PREFIX}{next_sprint}test"
-
-
-
-    # --- Bootstrap first sprint ---
-    if not any(b.startswith(SPRINT_BRANCH_PREFIX) for b in branch_names):
-        print("No sprint branches detected — bootstrapping s1test.")
-        sha = github_get(f"/branches/{MAIN_BRANCH}")["commit"]["sha"]
-        github_post("/git/refs", {"ref": "refs/heads/s1test", "sha": sha})
-        print("Created s1test from main.")
-
-        # Initialize version to 1.1.0 (sprint 1)
-        _, new_version, new_content = bump_version(Path(INIT_PATH).read_text())
-        update_file("demo_package/__init__.py", new_content, f"Bump version to {new_version}", next_branch)
-        print(f"Bootstrapped version -> {new_version}")
-        
-        open_prs = github_get(f"/pulls?state=open&head=s1test&base={MAIN_BRANCH}")
-        if not open_prs:
-            pr_payload = {
-                "title": "Initial Biweekly Sprint 1: s1test → main",
-                "head": "s1test",
-                "base": MAIN_BRANCH,
-                "body": "Bootstrap PR for the first sprint cycle."
-            }
-            pr = github_post("/pulls", pr_payload)
-            print(f"Created bootstrap PR: {pr['html_url']}")
-        return
-    
+    def commit(self, message):
+        if not self.files:
+            return None
+        parent_sha = github_get(f"/git/ref/heads/{self.branch}")["object"]["sha"]
+        base_tree = github_get(f"/git/commits/{parent_sha}")["tree"]["sha"]
+        entries = [
+            {"path": path, "mode": "100644", "type": "blob", "content": content}
+            for path, content in self.files.items()
+        ]
+        tree = github_post("/git/trees", {"base_tree": base_tree, "tree": entries})
+        commit = github_post("/git/commits", {"message": message, "tree": tree["sha"], "parents": [parent_sha]})
+        # Not forced: if the branch moved underneath us GitHub rejects the update.
+        github_patch(f"/git/refs/heads/{self.branch}", {"sha": commit["sha"], "force": False})
+        log(f"Committed {len(self.files)} file(s) to {self.branch} as {commit['sha'][:7]}")
+        self.files = {}
+        return commit
+
+
+# --- REPO STATE ---
+SNAPSHOT_PAGE_SIZE = 100
+
+SNAPSHOT_QUERY = """
+query RepoSnapshot($owner: String!, $name: String!, $base: String!, $pageSize: Int!,
+                   $branchCursor: String, $pullCursor: String, $tagCursor: String,
+                   $withBranches: Boolean!, $withPulls: Boolean!, $withTags: Boolean!%(file_vars)s) {
+  repository(owner: $owner, name: $name) {
+    branches: refs(refPrefix: "refs/heads/", first: $pageSize, after: $branchCursor) @include(if: $withBranches) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name target { oid } }
+    }
+    pullRequests(states: OPEN, baseRefName: $base, first: $pageSize, after: $pullCursor) @include(if: $withPulls) {
+      pageInfo { hasNextPage endCursor }
+      nodes { number title body url headRefName headRefOid }
+    }
+    tags: refs(refPrefix: "refs/tags/", first: $pageSize, after: $tagCursor) @include(if: $withTags) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name target { oid } }
+    }
+%(file_fields)s
+  }
+}
+"""
+
+BLOB_QUERY = """
+query BlobTexts($owner: String!, $name: String!%(file_vars)s) {
+  repository(owner: $owner, name: $name) {
+%(file_fields)s
+  }
+}
+"""
+
+
+@dataclass
+class RepoSnapshot:
+    """In-memory view of the repository that a release run reads from."""
+
+    branches: dict = field(default_factory=dict)  # branch name -> head sha
+    pulls: list = field(default_factory=list)  # open PRs against the main branch, REST-shaped
+    tags: dict = field(default_factory=dict)  # tag name -> target sha
+    files: dict = field(default_factory=dict)  # (ref, path) -> text, None if absent
+
+    def file(self, path, ref=None):
+        return self.files.get((ref or current_repo().main_branch, Path(path).as_posix()))
+
+    def pull_from(self, head):
+        return next((pr for pr in self.pulls if pr["head"]["ref"] == head), None)
+
+
+def _file_query_parts(ref_paths):
+    file_vars = "".join(f", $e{i}: String!" for i in range(len(ref_paths)))
+    file_fields = "\n".join(
+        f"    f{i}: object(expression: $e{i}) {{ ... on Blob {{ text isTruncated }} }}"
+        for i in range(len(ref_paths))
+    )
+    variables = {f"e{i}": f"{ref}:{path}" for i, (ref, path) in enumerate(ref_paths)}
+    return {"file_vars": file_vars, "file_fields": file_fields}, variables
+
+
+def _blob_texts(repository, ref_paths):
+    texts = {}
+    for i, (ref, path) in enumerate(ref_paths):
+        blob = repository.get(f"f{i}")
+        if blob and blob.get("isTruncated"):
+            # GraphQL truncates large blobs; fetch the raw file instead.
+            r = get_client().get(
+                f"{current_repo().api_base}/contents/{path}?ref={ref}",
+                headers={"Accept": "application/vnd.github.raw"},
+            )
+            r.raise_for_status()
+            texts[(ref, path)] = r.text
+        else:
+            texts[(ref, path)] = blob.get("text") if blob else None
+    return texts
+
+
+def fetch_files(ref_paths):
+    """Return ``{(ref, path): text}`` for every pair in one GraphQL query."""
+    ref_paths = [(ref, Path(path).as_posix()) for ref, path in ref_paths]
+    if not ref_paths:
+        return {}
+    parts, variables = _file_query_parts(ref_paths)
+    owner, name = repo_owner_and_name()
+    data = github_graphql(BLOB_QUERY % parts, {"owner": owner, "name": name, **variables})
+    return _blob_texts(data["repository"], ref_paths)
+
+
+def load_repo_snapshot(paths=None, ref=None):
+    """Load branches, open PRs against main, tags and ``paths`` at ``ref``.
+
+    ``paths`` defaults to the repo's version file and ``ref`` to its main
+    branch. The changelog is left out: it can run to megabytes, and the plan
+    reads it from whichever ref the release builds on.
+
+    The first query returns everything; further queries are only issued to
+    page through connections with more than SNAPSHOT_PAGE_SIZE entries.
+    """
+    repo = current_repo()
+    paths = paths if paths is not None else (repo.init_path,)
+    ref = ref or repo.main_branch
+    ref_paths = [(ref, Path(p).as_posix()) for p in paths]
+    owner, name = repo_owner_and_name()
+    snapshot = RepoSnapshot()
+    cursors = {"branches": None, "pullRequests": None, "tags": None}
+    pending = set(cursors)
+    first = True
+    while pending:
+        parts, variables = _file_query_parts(ref_paths if first else [])
+        variables.update({
+            "owner": owner, "name": name, "base": repo.main_branch, "pageSize": SNAPSHOT_PAGE_SIZE,
+            "branchCursor": cursors["branches"], "pullCursor": cursors["pullRequests"],
+            "tagCursor": cursors["tags"], "withBranches": "branches" in pending,
+            "withPulls": "pullRequests" in pending, "withTags": "tags" in pending,
+        })
+        repository = github_graphql(SNAPSHOT_QUERY % parts, variables)["repository"]
+        if first:
+            snapshot.files.update(_blob_texts(repository, ref_paths))
+            first = False
+        for key in list(pending):
+            conn = repository[key]
+            for node in conn["nodes"]:
+                if key == "branches":
+                    snapshot.branches[node["name"]] = node["target"]["oid"]
+                elif key == "tags":
+                    snapshot.tags[node["name"]] = node["target"]["oid"]
+                else:
+                    snapshot.pulls.append({
+                        "number": node["number"], "title": node["title"], "body": node["body"],
+                        "html_url": node["url"],
+                        "head": {"ref": node["headRefName"], "sha": node["headRefOid"]},
+                    })
+            if conn["pageInfo"]["hasNextPage"]:
+                cursors[key] = conn["pageInfo"]["endCursor"]
+            else:
+                pending.discard(key)
+    log(f"Loaded snapshot: {len(snapshot.branches)} branches, {len(snapshot.pulls)} open PRs, {len(snapshot.tags)} tags")
+    return snapshot
+
+
+# --- CHANGELOG ---
+COMPARE_PAGE_SIZE = 100
+COMPARE_MAX_PAGES = 10  # commits beyond the newest pages are summarised as a count
+COMPARE_MAX_WORKERS = 4
+RELEASE_COMMIT_PREFIX = "Bump version to "
+
+_CURSOR_RE = re.compile(r"<!-- changelog-cursor: (\S+) -->")
+_HEADER_RE = re.compile(r"\A(?:# [^\n]*\n)?(?:\s*<!--[^\n]*-->\n)*\s*")
+_MERGE_PR_RE = re.compile(r"Merge pull request #(\d+) from \S+")
+
+
+def changelog_cursor(text):
+    """Last commit on main that ``text`` already covers, if it records one."""
+    m = _CURSOR_RE.search(text or "")
+    return m.group(1) if m else None
+
+def set_changelog_cursor(text, sha):
+    marker = f"<!-- changelog-cursor: {sha} -->"
+    if _CURSOR_RE.search(text):
+        return _CURSOR_RE.sub(marker, text, count=1)
+    header, body = _split_header(text)
+    return f"{header.rstrip()}\n\n{marker}\n\n{body}".lstrip("\n")
+
+def _split_header(text):
+    """Split off the title line and any marker comments above the first entry."""
+    m = _HEADER_RE.match(text)
+    return text[:m.end()], text[m.end():]
+
+def prepend_entry(text, entry):
+    header, body = _split_header(text)
+    header = header.rstrip()
+    return (f"{header}\n\n" if header else "") + (f"{entry}\n{body}" if body else entry)
+
+
+def previous_release_tag(tags, version):
+    """Highest ``vX.Y.Z`` tag older than ``version``, or None."""
+    target = tuple(map(int, version.split(".")))
+    older = []
+    for name in tags:
+        m = re.fullmatch(r"v(\d+)\.(\d+)\.(\d+)", name)
+        if m and tuple(map(int, m.groups())) < target:
+            older.append((tuple(map(int, m.groups())), name))
+    return max(older)[1] if older else None
+
+
+def compare_commits(base, head):
+    """Return ``(commits, total)`` for ``base...head``, oldest first.
+
+    The first page reports the total, so the remaining pages are fetched
+    concurrently. Only the newest COMPARE_MAX_PAGES pages are kept.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    endpoint = f"/compare/{base}...{head}?per_page={COMPARE_PAGE_SIZE}"
+    first = github_get(f"{endpoint}&page=1")
+    total = first["total_commits"]
+    pages = -(-total // COMPARE_PAGE_SIZE)
+    if pages <= COMPARE_MAX_PAGES:
+        start, commits = 2, list(first["commits"])
     else:
-    # --- 2. Merge or close any previous sprint PR ---
-        if next_branch:
-            open_prs = github_get(f"/pulls?state=open&base={MAIN_BRANCH}")
-            for pr in open_prs:
-                if pr["head"]["ref"] == next_branch:
-                    print(f"Found open PR from {next_branch}: {pr['html_url']}")
-                    try:
-                        merge_url = f"/pulls/{pr['number']}/merge"
-                        merge_payload = {
-                            "merge_method": "squash",
-                            "commit_title": f"Auto-merge {next_branch} → {MAIN_BRANCH}"
-                        }
-                        github_put(merge_url, merge_payload)
-                        print(f"Merged PR #{pr['number']} from {next_branch}")
-                    except requests.exceptions.HTTPError as e:
-                        print(f"Merge failed ({e}) — closing instead.")
-                        github_post(f"/issues/{pr['number']}", {"state": "closed"})
-                        print(f"Closed stale PR #{pr['number']}")
-
-
-    # --- Determine current sprint ---
-    #reclone now that pull request theoretically closed
-    clear_tmp_dir()
-    clone_repo_to_tmp(next_branch)
-    lines = Path(INIT_PATH).read_text().splitlines()
-    for line in lines:
-        m = re.search(r'"(\d+)\.(\d+)\.(\d+)"', line)
+        start, commits = pages - COMPARE_MAX_PAGES + 1, []
+    if pages >= start:
+        with ThreadPoolExecutor(max_workers=min(COMPARE_MAX_WORKERS, pages - start + 1), thread_name_prefix="compare") as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, github_get, f"{endpoint}&page={page}")
+                for page in range(start, pages + 1)
+            ]
+            for future in futures:
+                commits.extend(future.result()["commits"])
+    log(f"Compared {base[:12]}...{head[:7]}: {total} commit(s), {len(commits)} fetched")
+    return commits, total
+
+
+def changelog_items(commits):
+    """One line per change: merged PRs by title, other commits by subject."""
+    items = []
+    for commit in commits:
+        subject, _, body = commit["commit"]["message"].partition("\n")
+        m = _MERGE_PR_RE.match(subject)
         if m:
-            _, current_sprint, _ = map(int, m.groups())
-            break
+            title = body.strip().partition("\n")[0] or subject
+            lines = [f"{title} (#{m.group(1)})"]
+        elif subject.startswith("Auto-merge "):
+            # Squashed sprint roll-ups list the sprint branch's commits as "* subject".
+            lines = [line[2:].strip() for line in body.splitlines() if line.startswith("* ")]
+        elif re.search(r"\(#\d+\)$", subject):
+            lines = [subject]  # squash-merged PR
+        else:
+            lines = [f"{subject} ({commit['sha'][:7]})"]
+        for line in lines:
+            if line and not line.startswith(RELEASE_COMMIT_PREFIX) and line not in items:
+                items.append(line)
+    return items
+
+def changelog_entry(version, commits, total=None):
+    items = changelog_items(commits) or ["Automated biweekly release"]
+    lines = [f"- {item}" for item in items]
+    if total is not None and total > len(commits):
+        lines.append(f"- ...and {total - len(commits)} earlier commit(s)")
+    return f"## v{version} - {today}\n\n" + "\n".join(lines) + "\n"
+
+
+def changelog_shard(repo):
+    """File holding this cycle's entries, or None when the changelog isn't sharded.
+
+    Shards are per release year: the major version never changes on its
+    own, so a per-major file would grow without bound.
+    """
+    if repo.changelog_shard_dir is None:
+        return None
+    return repo.changelog_shard_dir / f"{release_cycle(repo).year}.md"
+
+def _index_link(repo, label, path):
+    return f"- [{label}]({Path(os.path.relpath(path, repo.changelog_path.parent)).as_posix()})"
+
+def render_changelog(repo, version, root_text, entry_text, base, head):
+    """Return ``{path: text}`` adding ``version``'s entry, covering ``base...head``.
+
+    Unsharded, the entry is prepended to the changelog itself. Sharded, it
+    goes to the release year's file and the changelog is a short index of
+    shards, so a release rewrites one shard plus the index. Either way the
+    changelog records ``head`` as the cursor the next release starts from.
+    """
+    commits, total = [], None
+    if base:
+        try:
+            commits, total = compare_commits(base, head)
+        except GitHubHTTPError as e:
+            log(f"Could not compare {base}...{head} ({e}); writing a generic entry.")
+    entry = changelog_entry(version, commits, total)
+    shard = changelog_shard(repo)
+    if shard is None:
+        return {repo.changelog_path: set_changelog_cursor(prepend_entry(root_text or "# Changelog\n", entry), head)}
+
+    files = {shard: prepend_entry(entry_text or f"# Changelog {shard.stem}\n", entry)}
+    header, body = _split_header(root_text or "# Changelog\n")
+    if "\n## " in f"\n{body}":
+        # First sharded release: move the old entries out of what becomes the index.
+        history = repo.changelog_shard_dir / "history.md"
+        files[history] = f"# Changelog (before sharding)\n\n{body}"
+        body = _index_link(repo, "Earlier releases", history) + "\n"
+    link = _index_link(repo, shard.stem, shard)
+    if link not in body.splitlines():
+        body = f"{link}\n{body}"
+    files[repo.changelog_path] = set_changelog_cursor(f"{header.rstrip() or '# Changelog'}\n\n{body}", head)
+    return files
+
+
+# --- RELEASE PLAN ---
+@dataclass
+class Operation:
+    """One write against GitHub; ``run`` receives the plan's shared state."""
+
+    name: str
+    description: str
+    run: object
+    deps: tuple = ()
+
+
+@dataclass
+class ReleasePlan:
+    version: str
+    branch: str
+    operations: list = field(default_factory=list)
+    state: dict = field(default_factory=dict)  # values produced while applying, e.g. main_sha
+
+    def describe(self):
+        if not self.operations:
+            return [f"v{self.version} on {self.branch} is up to date; nothing to do."]
+        return [f"{i}. {op.description}" for i, op in enumerate(self.operations, 1)]
+
+
+def sprint_branch(repo, sprint):
+    return f"{repo.sprint_prefix}{sprint}test"
+
+def sprint_of(repo, branch):
+    """Sprint number of a sprint branch name, or None for any other branch."""
+    m = re.fullmatch(re.escape(repo.sprint_prefix) + r"(\d+)test", branch)
+    return int(m.group(1)) if m else None
+
+def release_cycle(repo):
+    """First day of the biweekly cycle containing ``today``."""
+    weeks = (today - repo.start_date).days // 7
+    return repo.start_date + timedelta(weeks=weeks - weeks % 2)
+
+def cycle_marker(repo):
+    # Stamped into the PR body so a rerun can tell this cycle's PR from last cycle's.
+    return f"<!-- release-cycle: {release_cycle(repo).isoformat()} -->"
+
+
+def plan_release(repo, snapshot):
+    """Diff the repo state against this cycle's desired end state.
+
+    The desired state is: the previous sprint's PR merged, a branch for the
+    target sprint carrying the bumped version and a changelog entry, a
+    ``v<version>`` tag on main and an open PR for the target sprint. Only
+    operations for the parts that are missing end up in the plan, so a
+    rerun after a partial (or complete) run does just the remaining work.
+
+    The target sprint follows the open sprint PRs rather than main's
+    version, which lags behind when a merge failed and the PR was closed.
+    """
+    main_init = snapshot.file(repo.init_path)
+    major, sprint, _ = parse_version(main_init)
+    bootstrap = not any(sprint_of(repo, b) is not None for b in snapshot.branches)
+
+    sprint_pulls = sorted(
+        (sprint_of(repo, pr["head"]["ref"]), pr["number"], pr) for pr in snapshot.pulls
+        if sprint_of(repo, pr["head"]["ref"]) is not None
+    )
+    this_cycle = [item for item in sprint_pulls if cycle_marker(repo) in (item[2]["body"] or "")]
+    previous_pr = None
+    if this_cycle:
+        # Opened by an earlier run this cycle, which already dealt with the last sprint's PR.
+        target_sprint = this_cycle[-1][0]
+    elif sprint_pulls:
+        previous_sprint, _, previous_pr = sprint_pulls[-1]
+        target_sprint = previous_sprint + 1
     else:
-        raise RuntimeError("Could not determine current sprint from init.")
+        # No open sprint PR: bootstrap, or a run that stopped before opening
+        # one. Reuse the newest sprint branch rather than going back to one
+        # whose PR was already closed.
+        existing = [n for n in (sprint_of(repo, b) for b in snapshot.branches) if n is not None]
+        target_sprint = max([sprint + 1, *existing])
+    previous_branch = previous_pr["head"]["ref"] if previous_pr else None
+    branch = sprint_branch(repo, target_sprint)
+    version = f"{major}.{target_sprint}.0"
+
+    # The target branch starts from main after the merge, i.e. the merged
+    # branch's files; if it already exists its own files are what we diff.
+    if branch in snapshot.branches:
+        base_ref = branch
+    elif previous_pr:
+        base_ref = previous_branch
+    else:
+        base_ref = repo.main_branch
+    wanted = [(base_ref, repo.changelog_path)]
+    if base_ref != repo.main_branch:
+        wanted.append((base_ref, repo.init_path))
+    shard = changelog_shard(repo)
+    if shard is not None:
+        wanted.append((base_ref, shard))
+    files = fetch_files(wanted)
+    init_text = files.get((base_ref, repo.init_path.as_posix()), main_init) or main_init
+    changelog_text = files.get((base_ref, repo.changelog_path.as_posix()))
+    entry_text = files.get((base_ref, shard.as_posix())) if shard is not None else changelog_text
+
+    plan = ReleasePlan(version, branch, state={"main_sha": snapshot.branches[repo.main_branch]})
+    ops = plan.operations
+
+    if previous_pr:
+        ops.append(Operation(
+            "merge", f"Merge PR #{previous_pr['number']} ({previous_branch} → {repo.main_branch}), closing it if the merge fails",
+            lambda state: _merge_or_close(repo, previous_pr, state),
+        ))
+    if branch not in snapshot.branches:
+        ops.append(Operation(
+            "branch", f"Create {branch} from {repo.main_branch}",
+            lambda state: github_post("/git/refs", {"ref": f"refs/heads/{branch}", "sha": state["main_sha"]}),
+            deps=("merge",),
+        ))
 
-    current_branch = f"{SPRINT_BRANCH_PREFIX}{current_sprint}test"
-    next_sprint = current_sprint + 1
-    next_branch = f"{SPRINT_BRANCH_PREFIX}{next_sprint}test"
+    release = CommitBuilder(branch)
+    if parse_version(init_text)[1] != target_sprint:
+        release.add(repo.init_path, set_version(init_text, version))
+    changelog = None
+    changelog_paths = []
+    if f"## v{version} " not in (entry_text or ""):
+        # The entry covers main from the last release up to the head the
+        # branch is cut from, which is only known once the merge has run.
+        base = changelog_cursor(changelog_text) or previous_release_tag(snapshot.tags, version)
+        changelog = lambda head: render_changelog(repo, version, changelog_text, entry_text, base, head)
+        changelog_paths = [p.as_posix() for p in (shard, repo.changelog_path) if p is not None]
+    if release.files or changelog:
+        ops.append(Operation(
+            "commit", f"Commit {', '.join([*release.files, *changelog_paths])} for v{version} to {branch}",
+            lambda state: _commit_release(release, version, changelog, state),
+            deps=("merge", "branch"),
+        ))
 
-    # --- Ensure current branch exists ---
-    if next_branch not in branch_names:
-        sha = github_get(f"/branches/{MAIN_BRANCH}")["commit"]["sha"]
-        github_post("/git/refs", {"ref": f"refs/heads/{next_branch}", "sha": sha})
-        print(f"Created missing branch {next_branch}")
+    if f"v{version}" not in snapshot.tags:
+        ops.append(Operation(
+            "tag", f"Tag {repo.main_branch} as v{version}",
+            lambda state: _create_tag(version, state["main_sha"]),
+            deps=("merge",),
+        ))
+
+    if not snapshot.pull_from(branch):
+        if bootstrap:
+            title = f"Initial Biweekly Sprint {target_sprint}: {branch} → {repo.main_branch}"
+            body = "Bootstrap PR for the first sprint cycle."
+        else:
+            title = f"Biweekly Sprint {target_sprint}: {branch} → {repo.main_branch}"
+            body = f"Automated PR for sprint {target_sprint}. This PR remains open for 2 weeks."
+        pr_payload = {"title": title, "head": branch, "base": repo.main_branch, "body": f"{body}\n\n{cycle_marker(repo)}"}
+        ops.append(Operation(
+            "pull", f"Open PR {branch} → {repo.main_branch}",
+            lambda state: _open_pull(pr_payload),
+            deps=("branch", "commit"),
+        ))
+    return plan
 
-    # --- Bump version and changelog on main ---
-    _, new_version, new_content = bump_version(Path(INIT_PATH).read_text())
-    update_file("demo_package/__init__.py", new_content, f"Bump version to {new_version}", next_branch)
-    print(f"Bumped version to {new_version} on {MAIN_BRANCH}")
 
-    changelog_path = "CHANGELOG.md"
-    changelog_exists = True
+def _merge_or_close(repo, pr, state):
+    payload = {"merge_method": "squash", "commit_title": f"Auto-merge {pr['head']['ref']} → {repo.main_branch}"}
     try:
-        changelog_sha = github_get(f"/contents/{changelog_path}?ref={MAIN_BRANCH}")["sha"]
-        old_content = requests.get(github_get(f"/contents/{changelog_path}?ref={MAIN_BRANCH}")["download_url"]).text
-    except requests.exceptions.HTTPError:
-        changelog_exists = False
-        changelog_sha = None
-        old_content = "# Changelog\n"
-
-    new_entry = f"\n## v{new_version} - {today}\n\n- Automated biweekly release\n"
-    new_content = new_entry + "\n" + old_content
-    changelog_payload = {
-        "message": f"Update changelog for v{new_version}",
-        "content": base64.b64encode(new_content.encode("utf-8")).decode("utf-8"),
-        "branch": next_branch
-    }
-    if changelog_exists:
-        changelog_payload["sha"] = changelog_sha
-    github_put(f"/contents/{changelog_path}", changelog_payload)
-    print("Changelog updated.")
-
-    # --- Tag release ---
-    latest_commit_sha = github_get(f"/branches/{MAIN_BRANCH}")["commit"]["sha"]
-    tag_payload = {
-        "tag": f"v{new_version}",
-        "message": f"Release v{new_version}",
-        "object": latest_commit_sha,
+        state["main_sha"] = github_put(f"/pulls/{pr['number']}/merge", payload)["sha"]
+        log(f"Merged PR #{pr['number']} from {pr['head']['ref']}")
+    except GitHubHTTPError as e:
+        # A 5xx can arrive after GitHub has already applied the merge.
+        current = github_get(f"/pulls/{pr['number']}")
+        if current.get("merged"):
+            state["main_sha"] = current["merge_commit_sha"]
+            log(f"Merge of PR #{pr['number']} reported {e.response.status_code} but was applied")
+            return
+        log(f"Merge failed ({e}) — closing instead.")
+        github_patch(f"/pulls/{pr['number']}", {"state": "closed"})
+        log(f"Closed stale PR #{pr['number']}")
+
+def _commit_release(release, version, changelog, state):
+    if changelog is not None:
+        with current_tracer().phase("changelog"):
+            files = changelog(state["main_sha"])
+        for path, text in files.items():
+            release.add(path, text)
+    release.commit(f"{RELEASE_COMMIT_PREFIX}{version} and update changelog")
+
+def _open_pull(payload):
+    pr = github_post("/pulls", payload)
+    log(f"Created PR #{pr['number']}: {pr['html_url']}")
+
+def _create_tag(version, sha):
+    tag = github_post("/git/tags", {
+        "tag": f"v{version}",
+        "message": f"Release v{version}",
+        "object": sha,
         "type": "commit"
-    }
-    github_post("/git/tags", tag_payload)
-    github_post("/git/refs", {"ref": f"refs/tags/v{new_version}", "sha": latest_commit_sha})
-    print(f"Tagged v{new_version}")
+    })
+    github_post("/git/refs", {"ref": f"refs/tags/v{version}", "sha": tag["sha"]})
+    log(f"Tagged v{version}")
+
+
+def apply_plan(plan, max_workers=PLAN_MAX_WORKERS):
+    """Run ``plan``'s operations, each as soon as its dependencies are done.
+
+    Dependencies on operations that are not in the plan count as met.
+    Returns the names of the applied operations in completion order.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    pending = {op.name: op for op in plan.operations}
+    planned = set(pending)
+    done = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan") as pool:
+        running = {}
+        while pending or running:
+            for name, op in list(pending.items()):
+                if all(dep in done or dep not in planned for dep in op.deps):
+                    ctx = contextvars.copy_context()  # keep the repo context and tracer in the worker
+                    running[pool.submit(ctx.run, _run_operation, op, plan.state)] = name
+                    del pending[name]
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                future.result()
+                done.append(name)
+    return done
+
+
+def _run_operation(op, state):
+    with current_tracer().phase(op.name):
+        return op.run(state)
+
+
+# --- MAIN ---
+def release_repo(repo, dry_run=False):
+    """Plan this cycle's release for ``repo``, then apply it unless ``dry_run``."""
+    if not is_release_day():
+        log("Not a biweekly release day. Skipping.")
+        return {"status": "skipped"}
 
-    # --- Create next sprint branch from updated main ---
-    print(f"Syncing {MAIN_BRANCH} → {next_branch}")
+    tracer = Tracer(repo.name)
+    token = _current_tracer.set(tracer)
     try:
-        github_post("/git/refs", {"ref": f"refs/heads/{next_branch}", "sha": latest_commit_sha})
-        print(f"Created {next_branch}")
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 422:
-            print(f"{next_branch} already exists — skipping")
-        else:
-            raise
+        with tracer.phase("snapshot"):
+            snapshot = load_repo_snapshot()
+        with tracer.phase("plan"):
+            plan = plan_release(repo, snapshot)
+        log(f"Release plan for v{plan.version}:\n  " + "\n  ".join(plan.describe()))
+        operations = [op.name for op in plan.operations]
+        if dry_run:
+            return {"status": "planned", "version": plan.version, "operations": operations}
+        if not operations:
+            return {"status": "up-to-date", "version": plan.version, "operations": []}
+        return {"status": "released", "version": plan.version, "operations": apply_plan(plan)}
+    finally:
+        _current_tracer.reset(token)
+        tracer.emit()
 
-    print("\n Managing Pull Request lifecycle (end-of-cycle logic)")
 
-    # Figure out branches for context
-    #current_branch = next_branch
-    #next_branch = f"{SPRINT_BRANCH_PREFIX}{current_sprint + 2}test"
+def _entry_name(entry):
+    """``owner/name`` for a fleet entry that may not parse."""
+    api_base = entry.get("api_base") if isinstance(entry, dict) else None
+    return RepoConfig(api_base).name if isinstance(api_base, str) else repr(entry)
 
-    # --- Prepare next sprint branch before PR creation ---
-    latest_commit_sha = github_get(f"/branches/{current_branch}")["commit"]["sha"]
+def run_release(repo, deadline=None, dry_run=False):
+    """Release one repo with its own context; never raises.
+
+    ``repo`` is a ``RepoConfig`` or its field dict; a dict that doesn't parse
+    is reported as failed like any other error. ``deadline`` is a
+    ``time.monotonic()`` value after which the repo is not started at all,
+    so a fleet run stays inside the Lambda timeout.
+    """
+    started = time.monotonic()
+    if not isinstance(repo, RepoConfig):
+        try:
+            repo = RepoConfig.from_dict(repo)
+        except Exception as e:
+            log(f"Invalid repo entry {repo!r}: {e!r}")
+            return {"repo": _entry_name(repo), "status": "failed", "error": repr(e),
+                    "seconds": round(time.monotonic() - started, 2)}
+    token = _current_repo.set(repo)
     try:
-        github_post("/git/refs", {"ref": f"refs/heads/{next_branch}", "sha": latest_commit_sha})
-        print(f"Created next sprint branch {next_branch}")
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 422:
-            print(f"{next_branch} already exists — skipping creation.")
+        if deadline is not None and started > deadline:
+            log("Not enough time left in this invocation. Deferring.")
+            result = {"status": "deferred"}
         else:
-            raise
+            result = release_repo(repo, dry_run)
+    except Exception as e:
+        log(f"Release failed: {e!r}")
+        result = {"status": "failed", "error": repr(e)}
+    finally:
+        _current_repo.reset(token)
+    return {"repo": repo.name, **result, "seconds": round(time.monotonic() - started, 2)}
 
-    # --- Ensure there’s an active PR for the current sprint ---
-    existing_prs = github_get(f"/pulls?state=open&head={next_branch}&base={MAIN_BRANCH}")
-    if existing_prs:
-        print(f"Existing PR for {next_branch} already open: {existing_prs[0]['html_url']}")
-    else:
-        pr_payload = {
-            "title": f"Biweekly Sprint {current_sprint + 1}: {next_branch} → {MAIN_BRANCH}",
-            "head": next_branch,
-            "base": MAIN_BRANCH,
-            "body": f"Automated PR for sprint {current_sprint + 1}. This PR remains open for 2 weeks."
-        }
-        try:
-            pr = github_post("/pulls", pr_payload)
-            print(f"Created PR for {current_branch}: {pr['html_url']}")
-        except requests.exceptions.HTTPError as e:
-            print(f"Failed to create PR for {current_branch}: {e}")
+
+def run_fleet(repos, max_workers=FLEET_MAX_WORKERS, deadline=None, dry_run=False):
+    """Release many repos concurrently on a bounded thread pool.
+
+    Every repo gets its own context (config, snapshot, tracer) while
+    sharing the container's connection pool and rate-limit budget. Entries
+    are ``RepoConfig`` objects or field dicts. Returns one summary per
+    entry, in input order; a bad entry fails on its own.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="release") as pool:
+        results = list(pool.map(lambda repo: run_release(repo, deadline, dry_run), repos))
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    log(f"Fleet run finished: {json.dumps(counts, sort_keys=True)}")
+    return results
+
+
+def main(event=None, lambda_context=None):
+    """Lambda entry point.
+
+    An event with a ``repos`` list (each item a ``RepoConfig`` field dict)
+    runs fleet mode; otherwise the repo configured by ``API_BASE`` is
+    released. ``"dry_run": true`` logs and returns the plan without applying it.
+    """
+    event = event or {}
+    dry_run = bool(event.get("dry_run"))
+    if event.get("repos"):
+        deadline = None
+        if lambda_context is not None:
+            remaining_ms = lambda_context.get_remaining_time_in_millis()
+            deadline = time.monotonic() + (remaining_ms - FLEET_MIN_REMAINING_MS) / 1000
+        return run_fleet(event["repos"], event.get("max_workers", FLEET_MAX_WORKERS), deadline, dry_run)
+    return release_repo(current_repo(), dry_run)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the biweekly sprint roll-up.")
+    parser.add_argument("--dry-run", action="store_true", help="print the release plan without applying it")
+    args = parser.parse_args()
+    print(json.dumps(main({"dry_run": args.dry_run}), indent=2))
\ No newline at end of file